@@ -0,0 +1,4 @@
+"""
+性能基准测试
+使用 fontTools.fontBuilder 生成合成字体，无需联网即可运行
+"""
@@ -0,0 +1,122 @@
+"""
+OTF 转 TTF 收尾阶段基准测试
+对比旧流程（otf_to_ttf 内先编译一次 glyf、保存时再编译一次，并重复更新 hmtx）
+与当前流程（字形边界只计算一次、保存时只编译一次）的每个字重耗时。
+
+用法: python -m benchmarks.bench_otf2ttf [--glyphs 65000] [--repeat 3]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+from fontTools.ttLib import TTFont, newTable
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import make_font  # noqa: E402
+from otf2ttf.official.otf2ttf import (  # noqa: E402
+    POST_FORMAT,
+    glyphs_to_quadratic,
+    otf_to_ttf,
+    update_hmtx,
+)
+
+# 更纱黑体单个字重约含 6.5 万个字形
+SARASA_GLYPH_COUNT = 65000
+
+
+def legacy_otf_to_ttf(ttFont, quadGlyphs):
+    """旧版 otf_to_ttf 的收尾逻辑及调用方多余的 update_hmtx，仅用于对比"""
+    glyphOrder = ttFont.getGlyphOrder()
+    ttFont["loca"] = newTable("loca")
+    ttFont["glyf"] = glyf = newTable("glyf")
+    glyf.glyphOrder = glyphOrder
+    glyf.glyphs = quadGlyphs
+    del ttFont["CFF "]
+    glyf.compile(ttFont)
+    update_hmtx(ttFont, glyf)
+
+    ttFont["maxp"] = maxp = newTable("maxp")
+    maxp.tableVersion = 0x00010000
+    maxp.maxZones = 1
+    maxp.maxTwilightPoints = 0
+    maxp.maxStorage = 0
+    maxp.maxFunctionDefs = 0
+    maxp.maxInstructionDefs = 0
+    maxp.maxStackElements = 0
+    maxp.maxSizeOfInstructions = 0
+    maxp.maxComponentElements = max(
+        len(g.components if hasattr(g, "components") else [])
+        for g in glyf.glyphs.values()
+    )
+    maxp.compile(ttFont)
+
+    post = ttFont["post"]
+    post.formatType = POST_FORMAT
+    post.extraNames = []
+    post.mapping = {}
+    post.glyphOrder = glyphOrder
+    post.compile(ttFont)
+
+    ttFont.sfntVersion = "\000\001\000\000"
+    update_hmtx(ttFont, ttFont["glyf"])
+
+
+def current_otf_to_ttf(ttFont, quadGlyphs):
+    otf_to_ttf(ttFont, quadGlyphs=quadGlyphs)
+
+
+def time_finish(otf_path, ttf_path, quad_glyphs, finish):
+    """计时从曲线转换完成到 TTF 写入磁盘的部分（cu2qu 本身两种流程相同）"""
+    font = TTFont(otf_path)
+    font.ensureDecompiled()
+    start = time.perf_counter()
+    finish(font, quad_glyphs)
+    font.save(ttf_path)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--glyphs", type=int, default=SARASA_GLYPH_COUNT)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="将结果写入该 JSON 文件")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        otf_path = make_font(os.path.join(work_dir, "Bench.otf"), args.glyphs)
+        source = TTFont(otf_path)
+        quad_glyphs = glyphs_to_quadratic(source.getGlyphSet())
+        source.close()
+
+        results = {"glyphs": args.glyphs, "repeat": args.repeat}
+        outputs = {}
+        for mode, finish in (
+            ("legacy", legacy_otf_to_ttf),
+            ("current", current_otf_to_ttf),
+        ):
+            ttf_path = os.path.join(work_dir, f"{mode}.ttf")
+            timings = [
+                time_finish(otf_path, ttf_path, quad_glyphs, finish)
+                for _ in range(args.repeat)
+            ]
+            results[mode] = min(timings)
+            saved = TTFont(ttf_path)
+            outputs[mode] = [saved.reader[tag] for tag in ("glyf", "hmtx", "maxp")]
+            saved.close()
+
+        results["saved_seconds"] = results["legacy"] - results["current"]
+        results["identical_output"] = outputs["legacy"] == outputs["current"]
+
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
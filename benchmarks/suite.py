@@ -0,0 +1,231 @@
+"""
+流水线各阶段基准测试
+用合成字体离线测量 OTF 转 TTF、name 字段设置、TTC 合并与解压的耗时，
+分别测试串行与并行方式，结果以 JSON 输出，便于跟踪性能回归。
+
+用法: python -m benchmarks.suite [--glyphs 5000] [--fonts 4] [--repeat 3]
+      [--stages otf2ttf set_names ttc extract] [--output result.json]
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import zipfile
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+import fontTools  # noqa: E402
+import py7zr  # noqa: E402
+
+from benchmarks.synthetic import make_font  # noqa: E402
+from msyh_generate import (  # noqa: E402
+    _patch_msyh_ttf_worker,
+    generate_ttc_with_fonttools,
+    generate_ttc_with_shared_tables,
+)
+from utils.archive import extract_archive  # noqa: E402
+from utils.font_converter import batch_convert_otf_to_ttf  # noqa: E402
+from utils.parallel import run_in_order  # noqa: E402
+
+STAGES = ("otf2ttf", "set_names", "ttc", "extract")
+
+# 与 msyh.ttc 相同：一个 TTC 含四个字体，两两共用同一源字体
+TTC_FACES = ["msyh0.ttf", "msyh1.ttf", "msyh2.ttf", "msyh3.ttf"]
+
+
+def measure(func, repeat, setup=None):
+    """重复运行 func，返回最短用时（秒）；setup 在每次计时前运行且不计时"""
+    timings = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def bench_otf2ttf(work_dir, args):
+    otf_dir = os.path.join(work_dir, "otf")
+    os.makedirs(otf_dir)
+    otf_files = [
+        make_font(os.path.join(otf_dir, f"Bench-W{i}.otf"), args.glyphs, style=f"W{i}")
+        for i in range(args.fonts)
+    ]
+    results = []
+    for mode, use_parallel in (("serial", False), ("parallel", True)):
+        seconds = measure(
+            lambda: batch_convert_otf_to_ttf(
+                otf_dir,
+                verbose=False,
+                target_files=otf_files,
+                use_parallel=use_parallel,
+            ),
+            args.repeat,
+        )
+        results.append(
+            {
+                "stage": "otf2ttf",
+                "mode": mode,
+                "files": len(otf_files),
+                "seconds": seconds,
+            }
+        )
+    return results
+
+
+def prepare_sources(work_dir, args):
+    """生成 name 字段设置与 TTC 合并所用的源 TTF（两个源字体，对应四个目标）"""
+    src_dir = os.path.join(work_dir, "src")
+    if not os.path.isdir(src_dir):
+        os.makedirs(src_dir)
+        for style in ("Gothic", "Ui"):
+            make_font(
+                os.path.join(src_dir, f"Bench{style}.ttf"),
+                args.glyphs,
+                otf=False,
+                style=style,
+            )
+    return [
+        (dst, os.path.join(src_dir, f"Bench{'Gothic' if i % 2 == 0 else 'Ui'}.ttf"))
+        for i, dst in enumerate(TTC_FACES)
+    ]
+
+
+def bench_set_names(work_dir, args):
+    sources = prepare_sources(work_dir, args)
+    out_dir = os.path.join(work_dir, "named")
+    os.makedirs(out_dir, exist_ok=True)
+    tasks = [(dst, src, os.path.join(out_dir, dst)) for dst, src in sources]
+    results = []
+    for mode, use_parallel in (("serial", False), ("parallel", True)):
+        seconds = measure(
+            lambda: list(run_in_order(_patch_msyh_ttf_worker, tasks, use_parallel)),
+            args.repeat,
+        )
+        results.append(
+            {
+                "stage": "set_names",
+                "mode": mode,
+                "files": len(tasks),
+                "seconds": seconds,
+            }
+        )
+    return results
+
+
+def bench_ttc(work_dir, args):
+    named_dir = os.path.join(work_dir, "named")
+    if not all(os.path.exists(os.path.join(named_dir, dst)) for dst in TTC_FACES):
+        bench_set_names(work_dir, argparse.Namespace(**{**vars(args), "repeat": 1}))
+    ttf_list = [os.path.join(named_dir, dst) for dst in TTC_FACES]
+    results = []
+    for mode, build in (
+        ("fonttools", generate_ttc_with_fonttools),
+        ("shared_tables", generate_ttc_with_shared_tables),
+    ):
+        ttc_path = os.path.join(work_dir, f"msyh-{mode}.ttc")
+        seconds = measure(lambda: build(ttf_list, ttc_path), args.repeat)
+        results.append(
+            {
+                "stage": "ttc",
+                "mode": mode,
+                "files": len(ttf_list),
+                "seconds": seconds,
+                "output_bytes": os.path.getsize(ttc_path),
+            }
+        )
+    return results
+
+
+def bench_extract(work_dir, args):
+    sources = prepare_sources(work_dir, args)
+    members = sorted({src for _, src in sources})
+    # 包中再放入不需要的字体，模拟按映射表选择性解压
+    extra_dir = os.path.join(work_dir, "extra")
+    os.makedirs(extra_dir, exist_ok=True)
+    for i in range(args.fonts):
+        extra = os.path.join(extra_dir, f"Extra-{i}.ttf")
+        shutil.copyfile(members[i % len(members)], extra)
+        members.append(extra)
+    targets = {os.path.basename(src) for _, src in sources}
+
+    archives = {
+        "zip": os.path.join(work_dir, "fonts.zip"),
+        "7z": os.path.join(work_dir, "fonts.7z"),
+    }
+    with zipfile.ZipFile(archives["zip"], "w", zipfile.ZIP_DEFLATED) as zf:
+        for path in members:
+            zf.write(path, os.path.basename(path))
+    with py7zr.SevenZipFile(archives["7z"], "w") as archive:
+        for path in members:
+            archive.write(path, os.path.basename(path))
+
+    out_dir = os.path.join(work_dir, "extracted")
+    results = []
+    for fmt, archive_path in archives.items():
+        for mode, mode_targets in (("full", None), ("selective", targets)):
+            seconds = measure(
+                lambda: extract_archive(archive_path, out_dir, targets=mode_targets),
+                args.repeat,
+                setup=lambda: shutil.rmtree(out_dir, ignore_errors=True),
+            )
+            results.append(
+                {
+                    "stage": "extract",
+                    "mode": f"{fmt}-{mode}",
+                    "files": len(members) if mode_targets is None else len(targets),
+                    "seconds": seconds,
+                    "archive_bytes": os.path.getsize(archive_path),
+                }
+            )
+    return results
+
+
+BENCHMARKS = {
+    "otf2ttf": bench_otf2ttf,
+    "set_names": bench_set_names,
+    "ttc": bench_ttc,
+    "extract": bench_extract,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--glyphs", type=int, default=5000, help="每个合成字体的字形数")
+    parser.add_argument("--fonts", type=int, default=4, help="OTF 转换阶段的字体数")
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="每项重复次数，取最短用时"
+    )
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--output", help="将结果写入该 JSON 文件")
+    args = parser.parse_args()
+
+    report = {
+        "environment": {
+            "python": platform.python_version(),
+            "fonttools": fontTools.version,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "params": {"glyphs": args.glyphs, "fonts": args.fonts, "repeat": args.repeat},
+        "results": [],
+    }
+    with tempfile.TemporaryDirectory() as work_dir:
+        for stage in args.stages:
+            report["results"].extend(BENCHMARKS[stage](work_dir, args))
+
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
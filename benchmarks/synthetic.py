@@ -0,0 +1,82 @@
+"""
+合成字体生成模块
+按指定字形数生成轮廓复杂度接近 CJK 字形的 OTF/TTF 字体
+"""
+
+import math
+import random
+
+from fontTools.fontBuilder import FontBuilder
+from fontTools.pens.t2CharStringPen import T2CharStringPen
+from fontTools.pens.ttGlyphPen import TTGlyphPen
+
+UNITS_PER_EM = 1000
+ADVANCE_WIDTH = 1000
+
+# 每个字形的轮廓数与每条轮廓的曲线段数，与常见汉字的复杂度相当
+CONTOURS_PER_GLYPH = 8
+SEGMENTS_PER_CONTOUR = 6
+
+
+def _draw_glyph(pen, rng, quadratic):
+    """用随机扰动的闭合曲线画出一个字形"""
+    for _ in range(CONTOURS_PER_GLYPH):
+        cx, cy = rng.uniform(150, 850), rng.uniform(50, 750)
+        radius = rng.uniform(30, 120)
+        points = []
+        for i in range(SEGMENTS_PER_CONTOUR * 3):
+            angle = 2 * math.pi * i / (SEGMENTS_PER_CONTOUR * 3)
+            r = radius * rng.uniform(0.7, 1.3)
+            points.append(
+                (round(cx + r * math.cos(angle)), round(cy + r * math.sin(angle)))
+            )
+        pen.moveTo(points[0])
+        for i in range(SEGMENTS_PER_CONTOUR):
+            p1, p2 = points[i * 3 + 1], points[i * 3 + 2]
+            p3 = points[(i * 3 + 3) % len(points)]
+            if quadratic:
+                pen.qCurveTo(p1, p2, p3)
+            else:
+                pen.curveTo(p1, p2, p3)
+        pen.closePath()
+
+
+def make_font(path, num_glyphs, otf=True, family="Bench", style="Regular", seed=0):
+    """
+    生成含 num_glyphs 个字形（不含 .notdef）的合成字体并保存到 path。
+    otf 为 True 时生成 CFF 轮廓的 OTF，否则生成 TrueType 轮廓的 TTF。
+    相同参数生成的字体完全相同。
+    """
+    rng = random.Random(f"{seed}-{style}")
+    glyph_order = [".notdef"] + [f"uni{0x4E00 + i:04X}" for i in range(num_glyphs)]
+    fb = FontBuilder(UNITS_PER_EM, isTTF=not otf)
+    fb.setupGlyphOrder(glyph_order)
+    fb.setupCharacterMap({0x4E00 + i: glyph_order[i + 1] for i in range(num_glyphs)})
+
+    if otf:
+        charstrings = {}
+        for name in glyph_order:
+            pen = T2CharStringPen(ADVANCE_WIDTH, None)
+            _draw_glyph(pen, rng, quadratic=False)
+            charstrings[name] = pen.getCharString()
+        fb.setupCFF(
+            f"{family}-{style}", {"FullName": f"{family} {style}"}, charstrings, {}
+        )
+    else:
+        glyphs = {}
+        for name in glyph_order:
+            pen = TTGlyphPen(None)
+            _draw_glyph(pen, rng, quadratic=True)
+            glyphs[name] = pen.glyph()
+        fb.setupGlyf(glyphs)
+
+    metrics = {name: (ADVANCE_WIDTH, 0) for name in glyph_order}
+    fb.setupHorizontalMetrics(metrics)
+    fb.setupHorizontalHeader(ascent=880, descent=-120)
+    fb.setupNameTable({"familyName": family, "styleName": style})
+    fb.setupOS2(
+        sTypoAscender=880, sTypoDescender=-120, usWinAscent=880, usWinDescent=120
+    )
+    fb.setupPost()
+    fb.save(path)
+    return path
@@ -0,0 +1,38 @@
+"""
+结果目录清理脚本
+只保留最近 N 个版本目录，并删除去重存储中不再被引用的文件
+
+用法: python clean_results.py [--keep 5]
+"""
+
+import argparse
+import logging
+
+from utils.config import get_config_value, load_config
+from utils.result_store import gc_results
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="只保留最近 N 个结果版本目录")
+    parser.add_argument(
+        "--keep",
+        type=int,
+        help="保留的版本数，默认使用配置中的 RESULT_KEEP_VERSIONS",
+    )
+    args = parser.parse_args()
+
+    config = load_config()
+    keep = args.keep or get_config_value(config, "RESULT_KEEP_VERSIONS", None)
+    if not keep:
+        parser.error(
+            "请用 --keep 指定保留的版本数，或在配置中设置 RESULT_KEEP_VERSIONS"
+        )
+    gc_results(config, keep)
+
+
+if __name__ == "__main__":
+    main()
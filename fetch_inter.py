@@ -5,12 +5,10 @@ Inter 字体包下载和解压模块
 import logging
 import os
 
-import requests as req
-
 from utils.archive import extract_archive
 from utils.config import get_config_value, load_config
+from utils.downloader import download_file, get_session, list_downloaded_files
 from utils.file_ops import ensure_dir_exists
-from utils.progress import print_progress_bar
 
 # 加载配置
 config = load_config()
@@ -31,7 +29,7 @@ def get_inter_version_and_assets(silent=False):
     if _inter_version_cache is not None:
         return _inter_version_cache
     try:
-        response = req.get(
+        response = get_session().get(
             INTER_API_URL, timeout=get_config_value(config, "DOWNLOAD_TIMEOUT", 10)
         )
         details = response.json()
@@ -56,7 +54,7 @@ def find_local_inter_zip():
     )
     if not os.path.exists(dir_):
         return None
-    files = os.listdir(dir_)
+    files = list_downloaded_files(dir_)
     zips = [f for f in files if f.startswith("Inter-") and f.endswith(".zip")]
     if not zips:
         return None
@@ -79,10 +77,11 @@ def get_latest_inter_zip_url():
     return None
 
 
-def download(url, save_dir=None):
+def download(url, save_dir=None, show_progress=True):
     """下载文件并显示进度条
     :param url: 下载链接
     :param save_dir: 保存目录，默认为配置中的 SOURCE_FILES_DIR
+    :param show_progress: 是否显示进度条（并发下载时应关闭）
     :return: 下载文件的路径
     """
     if save_dir is None:
@@ -97,60 +96,50 @@ def download(url, save_dir=None):
         return target_path
 
     try:
-        resp = req.get(
-            url, timeout=get_config_value(config, "DOWNLOAD_TIMEOUT", 10), stream=True
+        logging.info(f"开始下载: {filename}")
+        download_file(
+            url,
+            target_path,
+            timeout=get_config_value(config, "DOWNLOAD_TIMEOUT", 10),
+            show_progress=show_progress,
         )
-        total_size = int(resp.headers.get("content-length", 0))
-        downloaded_size = 0
-
-        with open(target_path, "wb") as f:
-            for chunk in resp.iter_content(chunk_size=8192):
-                if chunk:
-                    f.write(chunk)
-                    downloaded_size += len(chunk)
-                    print_progress_bar(
-                        downloaded_size,
-                        total_size,
-                        prefix="下载进度",
-                        suffix=f"{downloaded_size}/{total_size} 字节",
-                        length=30,
-                    )
-
-        print()  # 进度条完成后换行
         logging.info(f"下载完成: {filename}")
         return target_path
     except Exception as e:
+        # 未完成的 .part 文件会保留，下次运行时断点续传
         logging.error(f"下载失败: {filename}, 错误: {e}")
-        if os.path.exists(target_path):
-            os.remove(target_path)
         raise RuntimeError(f"下载文件失败: {filename}") from e
 
 
-def unzip_inter(path, out_dir=None):
+def unzip_inter(path, out_dir=None, targets=None):
     """解压 Inter 字体包
     :param path: 字体包路径
     :param out_dir: 解压目录，默认为配置中的 TEMP_DIR
+    :param targets: 仅解压这些字体文件名，为 None 时解压全部
     """
     if out_dir is None:
         out_dir = get_config_value(config, "TEMP_DIR", "./temp")
     out_dir = os.path.normpath(out_dir)
     logging.info(f"开始解压 {os.path.basename(path)} 到 {out_dir}")
     try:
-        extract_archive(path, out_dir)
+        extract_archive(path, out_dir, targets=targets)
         logging.info("解压完成")
     except Exception as e:
         logging.error(f"解压失败: {e}")
         raise RuntimeError(f"解压文件失败: {os.path.basename(path)}") from e
 
 
-def fetch_inter():
+def fetch_inter(targets=None, extract=True):
     """获取 Inter 字体包（优先使用本地包）
+    :param targets: 仅解压这些字体文件名，为 None 时解压全部
+    :param extract: 为 False 时只获取字体包，不解压
     :return: 字体包路径
     """
     local_zip = find_local_inter_zip()
     if local_zip:
         logging.info(f"已存在本地 Inter 包，跳过下载: {os.path.basename(local_zip)}")
-        unzip_inter(local_zip)
+        if extract:
+            unzip_inter(local_zip, targets=targets)
         return local_zip
 
     url = get_latest_inter_zip_url()
@@ -159,7 +148,8 @@ def fetch_inter():
 
     logging.info(f"下载 Inter 包: {url}")
     zip_path = download(url)
-    unzip_inter(zip_path)
+    if extract:
+        unzip_inter(zip_path, targets=targets)
     return zip_path
 
 
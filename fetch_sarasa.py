@@ -2,16 +2,14 @@
 更纱黑体字体包下载和解压模块
 """
 
-import hashlib
 import logging
 import os
 
-import requests as req
-
 from utils.archive import extract_archive
 from utils.config import get_config_value, load_config
+from utils.digest import file_sha256
+from utils.downloader import download_file, get_session, list_downloaded_files
 from utils.file_ops import ensure_dir_exists
-from utils.progress import print_progress_bar
 
 # 加载配置
 config = load_config()
@@ -31,7 +29,7 @@ def get_version_and_assets():
     if _sarasa_version_cache is not None:
         return _sarasa_version_cache
     try:
-        response = req.get(
+        response = get_session().get(
             API_URL, timeout=get_config_value(config, "DOWNLOAD_TIMEOUT", 10)
         )
         details = response.json()
@@ -78,15 +76,12 @@ def get_candidates(version):
 
 def verify_file_hash(file_path, expected_hash):
     """验证文件的 SHA-256 哈希值
+    文件大小和修改时间未变化时直接使用摘要缓存，不再重新读取文件
     :param file_path: 文件路径
     :param expected_hash: 预期的哈希值
     :return: 是否验证通过
     """
-    sha256_hash = hashlib.sha256()
-    with open(file_path, "rb") as f:
-        for byte_block in iter(lambda: f.read(4096), b""):
-            sha256_hash.update(byte_block)
-    actual_hash = sha256_hash.hexdigest()
+    actual_hash = file_sha256(file_path)
     return expected_hash.lower() == actual_hash.lower()
 
 
@@ -100,14 +95,15 @@ def find_all_local_packages():
     if not os.path.exists(dir_):
         return []
 
-    files = os.listdir(dir_)
+    files = list_downloaded_files(dir_)
     version, assets = get_version_and_assets()
     candidates = get_candidates(version) if version else []
 
     if not candidates:
         for file in files:
-            if file.startswith("SarasaUiSC-TTF-") or file.startswith(
-                "SarasaMonoSC-TTF-"
+            if file.endswith(".7z") and (
+                file.startswith("SarasaUiSC-TTF-")
+                or file.startswith("SarasaMonoSC-TTF-")
             ):
                 candidates.append(file)
 
@@ -155,10 +151,11 @@ def get_all_latest():
     ]
 
 
-def download(url, save_dir):
+def download(url, save_dir, show_progress=True):
     """下载文件并显示进度条，下载后进行 SHA-256 校验
     :param url: 下载链接
     :param save_dir: 保存目录
+    :param show_progress: 是否显示进度条（并发下载时应关闭）
     :return: 下载文件的路径
     """
     save_dir = os.path.normpath(save_dir)
@@ -180,58 +177,47 @@ def download(url, save_dir):
                 return target_path
             else:
                 logging.error(f"本地文件 SHA-256 校验失败，将重新下载: {filename}")
+                os.remove(target_path)
 
     try:
         logging.info(f"开始下载: {filename}")
-        resp = req.get(url, stream=True)
-        total_size = int(resp.headers.get("content-length", 0))
-        downloaded_size = 0
-
-        with open(target_path, "wb") as f:
-            for chunk in resp.iter_content(chunk_size=8192):
-                if chunk:
-                    f.write(chunk)
-                    downloaded_size += len(chunk)
-                    print_progress_bar(
-                        downloaded_size,
-                        total_size,
-                        prefix="下载进度",
-                        suffix=f"{downloaded_size}/{total_size} 字节",
-                        length=30,
-                    )
-
-        print()  # 进度条完成后换行
+        actual_hash = download_file(
+            url,
+            target_path,
+            timeout=get_config_value(config, "DOWNLOAD_TIMEOUT", 10),
+            show_progress=show_progress,
+        )
         logging.info(f"下载完成: {filename}")
 
-        # SHA-256校验
+        # SHA-256校验（摘要已在下载过程中计算）
         version, assets = get_version_and_assets()
         asset = next(
             (a for a in assets if a["name"] == filename and "digest" in a), None
         )
         if asset:
             expected_hash = asset["digest"].replace("sha256:", "")
-            if not verify_file_hash(target_path, expected_hash):
+            if expected_hash.lower() != actual_hash.lower():
                 os.remove(target_path)
                 raise RuntimeError(f"SHA-256 校验失败: {filename}")
             logging.info(f"SHA-256 校验成功: {filename}")
 
         return target_path
     except Exception as e:
+        # 未完成的 .part 文件会保留，下次运行时断点续传
         logging.error(f"下载失败: {filename}, 错误: {e}")
-        if os.path.exists(target_path):
-            os.remove(target_path)
         raise RuntimeError(f"下载文件失败: {filename}") from e
 
 
-def unzip(path):
+def unzip(path, targets=None):
     """解压字体包
     :param path: 字体包路径
+    :param targets: 仅解压这些字体文件名，为 None 时解压全部
     """
     out_dir = get_config_value(config, "TEMP_DIR", "./temp")
     out_dir = os.path.normpath(out_dir)
     logging.info(f"开始解压 {os.path.basename(path)} 到 {out_dir}")
     try:
-        extract_archive(path, out_dir)
+        extract_archive(path, out_dir, targets=targets)
         logging.info("解压完成")
     except Exception as e:
         logging.error(f"解压失败: {e}")
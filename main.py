@@ -1,76 +1,167 @@
 import logging
+from concurrent.futures import ThreadPoolExecutor
 
+import fetch_inter as inter
 import fetch_sarasa as sarasa
+from msyh_generate import get_msyh_mapping
 from msyh_workflow import generate_ms_yahei
 from segoe_workflow import generate_segoe_ui
-from utils.archive import extract_custom_font_packages
+from utils.archive import (
+    can_read_directly,
+    extract_custom_font_packages,
+    get_custom_package_paths,
+)
 from utils.cleanup import clean_temp_dir
 from utils.config import get_config_value, load_config, validate_config
 from utils.file_ops import create_directories
 from utils.font_converter import process_custom_font_packages
-from utils.result_manager import get_new_result_dir
+from utils.result_manager import get_failed_run_dir, get_new_result_dir
+from utils.result_store import gc_results, store_result_files
+from utils.profiling import collect_profiles, configure_profiling
+from utils.timing import get_spans, reset_timings, span, write_timings
 
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
 )
 
 
+def download_packages(config, sarasa_urls):
+    """
+    并发下载 Sarasa 字体包；启用 Segoe UI 时同时下载 Inter 字体包，
+    供之后的 Segoe UI 流程直接使用本地包。
+    返回 Sarasa 字体包的本地路径列表。
+    """
+    save_dir = get_config_value(config, "SOURCE_FILES_DIR", "./source_files")
+    inter_url = None
+    if (
+        get_config_value(config, "ENABLE_SEGOE_UI", True)
+        and not inter.find_local_inter_zip()
+    ):
+        inter_url = inter.get_latest_inter_zip_url()
+
+    total = len(sarasa_urls) + (1 if inter_url else 0)
+    max_workers = get_config_value(config, "MAX_PARALLEL_DOWNLOADS", 3) or 1
+    show_progress = total == 1 or max_workers == 1
+    with ThreadPoolExecutor(max_workers=min(max_workers, total)) as executor:
+        sarasa_futures = [
+            executor.submit(sarasa.download, url, save_dir, show_progress)
+            for url in sarasa_urls
+        ]
+        inter_future = None
+        if inter_url:
+            inter_future = executor.submit(
+                inter.download, inter_url, save_dir, show_progress
+            )
+        paths = [future.result() for future in sarasa_futures]
+        if inter_future is not None:
+            try:
+                inter_future.result()
+            except Exception as e:
+                # Inter 包下载失败时交由 Segoe UI 流程重试
+                logging.warning(f"Inter字体包预下载失败: {e}")
+    return paths
+
+
 def main():
     config = load_config()
+    reset_timings()
+    configure_profiling(config)
+    result_subdir = None
     try:
         logging.info("开始字体生成流程")
         validate_config(config)
         create_directories(config)
         # 获取所有源文件包或处理自定义包
         download_mode = get_config_value(config, "FONT_PACKAGE_SOURCE", "local")
+        # 仅解压映射表中用到的字体文件
+        targets = None
+        if get_config_value(config, "ENABLE_SELECTIVE_EXTRACTION", True):
+            targets = {src for _, src in get_msyh_mapping()}
+        # 直接读取模式下不解压，由微软雅黑流程直接从这些字体包读取源字体
+        msyh_packages = None
         if get_config_value(config, "ENABLE_MS_YAHEI", True):
+            direct = get_config_value(config, "ENABLE_DIRECT_ARCHIVE_READ", False)
+            if direct and not can_read_directly(src for _, src in get_msyh_mapping()):
+                logging.info(
+                    "映射表中有非 TTF 源字体，不能直接读取字体包，改为解压到临时目录"
+                )
+                direct = False
             if download_mode == "custom":
-                # custom 模式下，解压自定义字体包到 temp 目录（仅支持 zip/7z）
-                try:
-                    extract_custom_font_packages(config)
-                    logging.info("自定义字体包已全部解压到临时目录")
-                    # 处理自定义字体包的OTF转TTF
-                    process_custom_font_packages(config)
-                except Exception as e:
-                    logging.error(f"自定义字体包处理失败: {e}")
-                    raise
+                if direct:
+                    msyh_packages = get_custom_package_paths(config)
+                else:
+                    # custom 模式下，解压自定义字体包到 temp 目录（仅支持 zip/7z）
+                    try:
+                        with span("extract"):
+                            extract_custom_font_packages(config)
+                        logging.info("自定义字体包已全部解压到临时目录")
+                        # 处理自定义字体包的OTF转TTF
+                        with span("convert"):
+                            process_custom_font_packages(config)
+                    except Exception as e:
+                        logging.error(f"自定义字体包处理失败: {e}")
+                        raise
 
             elif download_mode == "local":
                 packages = sarasa.find_all_local_packages()
                 if not packages:
                     logging.error("未找到任何本地源文件包，请检查 source_files 目录")
                     raise
-                for pkg in packages:
-                    logging.info(f"本地包: {pkg}")
-                    sarasa.unzip(pkg)
+                if direct:
+                    msyh_packages = packages
+                else:
+                    with span("extract", packages=len(packages)):
+                        for pkg in packages:
+                            logging.info(f"本地包: {pkg}")
+                            sarasa.unzip(pkg, targets=targets)
             else:
                 urls = sarasa.get_all_latest()
                 if not urls:
                     logging.error("未找到任何可用的在线源文件包")
                     raise
-                for url in urls:
-                    path = sarasa.download(
-                        url,
-                        save_dir=get_config_value(
-                            config, "SOURCE_FILES_DIR", "./source_files"
-                        ),
-                    )
-                    sarasa.unzip(path)
+                with span("download", packages=len(urls)):
+                    paths = download_packages(config, urls)
+                if direct:
+                    msyh_packages = paths
+                else:
+                    with span("extract", packages=len(paths)):
+                        for path in paths:
+                            sarasa.unzip(path, targets=targets)
         # 生成唯一结果子目录
         result_subdir = get_new_result_dir(config)
         # 生成微软雅黑字体
         if get_config_value(config, "ENABLE_MS_YAHEI", True):
-            generate_ms_yahei(config, result_subdir)
+            with span("msyh"):
+                generate_ms_yahei(config, result_subdir, archive_paths=msyh_packages)
         # 生成Segoe UI字体
         if get_config_value(config, "ENABLE_SEGOE_UI", True):
-            generate_segoe_ui(config, result_subdir)
+            with span("segoe"):
+                generate_segoe_ui(config, result_subdir)
         logging.info(f"所有字体生成完成，结果目录：{result_subdir}")
+        # 存入去重存储并写出 manifest.json，按需清理旧版本
+        if get_config_value(config, "ENABLE_RESULT_STORE", True):
+            with span("store"):
+                store_result_files(config, result_subdir)
+            keep = get_config_value(config, "RESULT_KEEP_VERSIONS", None)
+            if keep:
+                gc_results(config, keep)
         # 自动清理 temp 目录（可选）
         if get_config_value(config, "CLEAN_TEMP_ON_SUCCESS", False):
             clean_temp_dir(config)
     except Exception as e:
         logging.error(f"程序执行出错: {str(e)}")
         raise
+    finally:
+        # 失败时同样写出已完成阶段的耗时，便于定位问题；
+        # 下载、解压、转换阶段失败时结果目录尚未创建，改写到 RESULT_DIR/last_failed_run
+        report_dir = result_subdir
+        if report_dir is None and get_spans():
+            report_dir = get_failed_run_dir(config)
+            logging.info(f"运行失败，耗时统计保存到: {report_dir}")
+        if report_dir and get_config_value(config, "ENABLE_TIMING_REPORT", True):
+            write_timings(report_dir)
+        if report_dir:
+            collect_profiles(report_dir)
 
 
 if __name__ == "__main__":
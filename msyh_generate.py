@@ -1,16 +1,30 @@
+import io
 import json
 import logging
 import os
 import sys
 import time
 import traceback
-from concurrent.futures import ThreadPoolExecutor
-
-from fontTools.ttLib import TTCollection, TTFont
-
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from fontTools.ttLib import TTCollection, TTFont, newTable
+
+from utils.archive import read_archive_members
+from utils.build_cache import (
+    hash_file,
+    make_cache_key,
+    restore_from_cache,
+    store_in_cache,
+)
 from utils.config import get_config_value, load_config
 from utils.file_ops import find_font_file, safe_copy
+from utils.parallel import run_in_order
+from utils.profiling import profile_call
 from utils.progress import print_progress_bar
+from utils.result_manager import publish_result
+from utils.sfnt import build_collection, read_table, replace_table
+from utils.timing import get_worker_peak_rss, record_task
 
 # 加载配置
 config = load_config()
@@ -93,6 +107,9 @@ def load_font_info():
 
 font_info_map = load_font_info()
 
+# 本次运行中各目标TTF的构建缓存键，供TTC缓存键使用
+_ttf_cache_keys = {}
+
 
 def parse_ttf_filename(ttf_filename):
     # 解析如 msyh0.ttf, msyhbd2.ttf, msyhl3.ttf, msyhsb1.ttf, msyhxl0.ttf
@@ -125,25 +142,23 @@ def fix_postscript_name(name):
     return name[:63]
 
 
-def set_names_with_json(ttf_path, file_name):
+def build_msyh_name_table(file_name, name_data):
+    """
+    按 font_info 修改源字体的 name 表原始数据 name_data，返回新的 name 表数据。
+    无法解析 file_name 或没有对应元信息时返回 None。
+    """
     ttc, index = parse_ttf_filename(file_name)
 
     if not ttc or index is None:
         logging.warning(f"无法解析 {file_name} 的 ttc 组和 index，跳过 name 字段设置")
-        return
+        return None
     key = (ttc.lower(), index)
     info = font_info_map.get(key)
     if not info:
         logging.warning(f"未找到 {ttc} index={index} 的元信息，跳过 name 字段设置")
-        return
-    font = TTFont(ttf_path)
-    name_table = font["name"]
-    if not hasattr(name_table, "setName"):
-
-        logging.error(
-            f"font['name'] 没有 setName 方法，无法设置 name 字段。请检查 fontTools 版本或字体文件: {ttf_path}"
-        )
-        return
+        return None
+    name_table = newTable("name")
+    name_table.decompile(name_data, None)
     for field in info.get("name_fields", []):
         parts = dict(
             item.strip().split("=", 1) for item in field.split(",") if "=" in item
@@ -160,7 +175,23 @@ def set_names_with_json(ttf_path, file_name):
             name_table.setName(value, nameID, platformID, platEncID, langID)
         except Exception as e:
             logging.warning(f"setName failed: {e}")
-    font.save(ttf_path)
+    return name_table.compile(None)
+
+
+def set_names_with_json(ttf_path, file_name, src_path=None):
+    """
+    按 font_info 设置 ttf_path 的 name 字段。
+    只读取并重写 name 表，其余表按原始字节复制，不经过 TTFont 解析与保存。
+    src_path 不为空时直接从源字体读取，结果写入 ttf_path。
+    返回是否写入了 ttf_path。
+    """
+    if src_path is None:
+        src_path = ttf_path
+    name_data = build_msyh_name_table(file_name, read_table(src_path, "name"))
+    if name_data is None:
+        return False
+    replace_table(src_path, ttf_path, "name", name_data)
+    return True
 
 
 def filter_mapping_by_config(mapping):
@@ -213,61 +244,106 @@ def get_ttc_groups():
     return filtered_groups
 
 
-def batch_copy_msyh_ttf():
-    mapping = get_msyh_mapping()
-    temp_dir = get_config_value(config, "TEMP_DIR", "./temp")
-    total = len(mapping)
-    if total == 0:
-        raise RuntimeError("微软雅黑字体映射表为空，请检查配置")
+def get_ttf_cache_key(src_path, dst):
+    """按源字体哈希与目标文件的 name 元信息生成TTF缓存键"""
+    ttc, index = parse_ttf_filename(dst)
+    info = font_info_map.get((ttc.lower(), index)) if ttc else None
+    return make_cache_key("msyh-ttf", dst, hash_file(src_path), info)
 
-    logging.info(f"开始复制源TTF文件，共 {total} 个文件")
-    copied_count = 0
 
-    for idx, (dst, src) in enumerate(mapping, 1):
+def _patch_msyh_ttf_worker(dst, src_path, dst_path):
+    """
+    在子进程中运行的单个TTF生成函数：从源字体读取并写入设置好 name 字段的目标文件。
+    设置 name 字段失败时保留未修改的副本，此时 success 为 True，error_msg 为失败原因。
+    返回 (dst, success: bool, duration: float, error_msg: str, peak_rss: int|None)
+    """
+    start = time.time()
+    success, error_msg = True, ""
+    try:
+        if not set_names_with_json(dst_path, dst, src_path=src_path):
+            safe_copy(src_path, dst_path)
+    except Exception as e:
+        error_msg = str(e)
         try:
-            rel_src_path = find_font_file(temp_dir, src)
-            src_path = os.path.join(temp_dir, rel_src_path)
-            dst_path = os.path.join(temp_dir, dst)
             safe_copy(src_path, dst_path)
-            copied_count += 1
-            print_progress_bar(
-                idx, total, prefix="复制源TTF文件", suffix=f"{dst} ({idx}/{total})"
-            )
-            logging.debug(f"复制成功: {src} -> {dst}")
-        except Exception as e:
-            print()  # 清理进度条
-            logging.error(f"源字体不存在: {src}，查找异常: {e}")
-            raise RuntimeError(f"缺少必需的源字体文件: {src}") from e
-
-    print()  # 进度条完成后换行
-    logging.info(f"TTF文件复制完成 - 成功: {copied_count}")
+        except Exception as copy_error:
+            success, error_msg = False, str(copy_error)
+    return (dst, success, time.time() - start, error_msg, get_worker_peak_rss())
 
 
-def batch_patch_names():
+def batch_copy_and_patch_msyh_ttf(use_parallel=None, max_workers=None):
+    """
+    复制源TTF并设置Name信息的合并阶段：每个源字体只读取一次，
+    修改 name 表后直接写入 temp 目录下的目标文件。
+    use_parallel: 是否使用多进程并行处理，为 None 时从配置文件读取
+    max_workers: 最大工作进程数，为 None 时从配置文件读取
+    """
     mapping = get_msyh_mapping()
+    temp_dir = get_config_value(config, "TEMP_DIR", "./temp")
     total = len(mapping)
     if total == 0:
         raise RuntimeError("微软雅黑字体映射表为空，请检查配置")
 
-    logging.info(f"开始设置字体Name信息，共 {total} 个文件")
-    processed_count = 0
-    skipped_count = 0
+    logging.info(f"开始生成并设置微软雅黑TTF文件，共 {total} 个文件")
+    _ttf_cache_keys.clear()
+    cached_count = 0
+    use_cache = get_config_value(config, "ENABLE_BUILD_CACHE", False)
 
-    for idx, (dst, _) in enumerate(mapping, 1):
+    # 查找源字体并处理缓存命中，未命中的加入任务列表
+    tasks = []
+    for dst, src in mapping:
         try:
-            ttf_path = os.path.join(get_config_value(config, "TEMP_DIR", "./temp"), dst)
-            set_names_with_json(ttf_path, dst)
-            processed_count += 1
-            print_progress_bar(
-                idx, total, prefix="设置字体Name信息", suffix=f"{dst} ({idx}/{total})"
-            )
+            rel_src_path = find_font_file(temp_dir, src)
         except Exception as e:
-            skipped_count += 1
-            logging.warning(f"设置字体Name信息失败: {dst}, 错误: {e}")
+            logging.error(f"源字体不存在: {src}，查找异常: {e}")
+            raise RuntimeError(f"缺少必需的源字体文件: {src}") from e
+
+        src_path = os.path.join(temp_dir, rel_src_path)
+        dst_path = os.path.join(temp_dir, dst)
+        if use_cache:
+            key = get_ttf_cache_key(src_path, dst)
+            _ttf_cache_keys[dst] = key
+            if restore_from_cache(config, key, dst_path):
+                cached_count += 1
+                continue
+        tasks.append((dst, src_path, dst_path))
+
+    if use_parallel is None:
+        use_parallel = get_config_value(config, "ENABLE_PARALLEL_NAME_PATCHING", True)
+    if max_workers is None:
+        max_workers = get_config_value(config, "MAX_PARALLEL_PATCH_WORKERS", None)
+
+    failed = []
+    for idx, (dst, success, duration, error_msg, peak_rss) in enumerate(
+        run_in_order(_patch_msyh_ttf_worker, tasks, use_parallel, max_workers), 1
+    ):
+        record_task(dst, duration, success=success, peak_rss_bytes=peak_rss)
+        if success and error_msg:
+            # 未修改 name 的副本不存入缓存，下次运行时重新尝试
+            print()  # 清理进度条
+            logging.warning(f"设置字体Name信息失败: {dst}, 错误: {error_msg}")
+        elif success:
+            if dst in _ttf_cache_keys:
+                store_in_cache(
+                    config, _ttf_cache_keys[dst], os.path.join(temp_dir, dst)
+                )
+            logging.debug(f"生成成功: {dst} (用时 {duration:.2f} 秒)")
+        else:
+            failed.append(dst)
+            print()  # 清理进度条
+            logging.error(f"生成 {dst} 失败: {error_msg}")
+        print_progress_bar(
+            idx,
+            len(tasks),
+            prefix="生成微软雅黑TTF",
+            suffix=f"{dst} ({idx}/{len(tasks)})",
+        )
 
     print()  # 进度条完成后换行
+    if failed:
+        raise RuntimeError(f"生成微软雅黑TTF文件失败: {', '.join(failed)}")
     logging.info(
-        f"字体Name信息设置完成 - 处理: {processed_count}, 跳过: {skipped_count}"
+        f"微软雅黑TTF文件生成完成 - 成功: {total}, 其中来自缓存: {cached_count}"
     )
 
 
@@ -294,7 +370,15 @@ def generate_ttc_with_fonttools(ttf_list, ttc_path):
             ttc.fonts = fonts
 
         # 优化4: 直接保存，避免额外的内存复制
-        ttc.save(ttc_path)
+        # 先写临时文件再替换：ttc_path 若与已发布的结果文件是硬链接，不会被原地改写
+        tmp_path = ttc_path + ".tmp"
+        try:
+            ttc.save(tmp_path)
+            os.replace(tmp_path, ttc_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
 
     finally:
         # 优化5: 及时清理内存
@@ -306,6 +390,17 @@ def generate_ttc_with_fonttools(ttf_list, ttc_path):
         del fonts
 
 
+def generate_ttc_with_shared_tables(ttf_list, ttc_path):
+    """
+    直接按原始表数据合并 ttf_list 为 ttc_path，内容相同的表只写入一次。
+    不解析、不重新编译任何表，适用于 name 字段已写好的 TTF。
+    """
+    written_bytes, shared_bytes = build_collection(ttf_list, ttc_path)
+    logging.debug(
+        f"{os.path.basename(ttc_path)}: 写入表数据 {written_bytes} 字节，共享 {shared_bytes} 字节"
+    )
+
+
 def batch_generate_ttc(ttc_names=None, use_parallel=None, max_workers=None):
     """
     ttc_names: 指定只生成哪些 ttc（如 ["msyh.ttc"]），为 None 时全量生成
@@ -318,6 +413,7 @@ def batch_generate_ttc(ttc_names=None, use_parallel=None, max_workers=None):
 
     # 预先检查所有文件是否存在，避免重复检查
     ttc_tasks = []
+    cached_count = 0
     enable_extra_italic = get_config_value(config, "MSYH_ENABLE_EXTRA_ITALIC", True)
     expected_ttf_count = 4 if enable_extra_italic else 2
 
@@ -342,9 +438,17 @@ def batch_generate_ttc(ttc_names=None, use_parallel=None, max_workers=None):
         ttc_path = os.path.abspath(
             os.path.join(get_config_value(config, "TEMP_DIR", "./temp"), ttc_name)
         )
+        ttc_key = get_ttc_cache_key(ttc_name, ttf_list)
+        if ttc_key and restore_from_cache(config, ttc_key, ttc_path):
+            cached_count += 1
+            continue
         ttc_tasks.append((ttc_name, ttf_paths_exist, ttc_path))
 
+    if cached_count:
+        logging.info(f"{cached_count} 个 TTC 文件直接从构建缓存恢复")
     if not ttc_tasks:
+        if cached_count:
+            return
         logging.warning("没有找到需要生成的 TTC 文件")
         return
 
@@ -353,6 +457,10 @@ def batch_generate_ttc(ttc_names=None, use_parallel=None, max_workers=None):
         use_parallel = get_config_value(config, "ENABLE_PARALLEL_TTC_GENERATION", True)
     if max_workers is None:
         max_workers = get_config_value(config, "MAX_PARALLEL_TTC_WORKERS", None)
+    use_processes = (
+        str(get_config_value(config, "TTC_PARALLEL_MODE", "thread")).lower()
+        == "process"
+    )
 
     # 根据配置决定是否使用并行处理
     if use_parallel:
@@ -361,61 +469,105 @@ def batch_generate_ttc(ttc_names=None, use_parallel=None, max_workers=None):
             max_workers = min(4, len(ttc_tasks))
 
         logging.info(
-            f"使用并行处理生成 [{len(ttc_tasks)}/{len(ttc_groups)}] 个 TTC 文件，工作线程数: {max_workers}"
+            f"使用并行处理生成 [{len(ttc_tasks)}/{len(ttc_groups)}] 个 TTC 文件，"
+            f"{'工作进程' if use_processes else '工作线程'}数: {max_workers}"
         )
-        success_count, failed_count = _batch_generate_ttc_parallel(
-            ttc_tasks, max_workers
+        succeeded, failed_count = _batch_generate_ttc_parallel(
+            ttc_tasks, max_workers, use_processes
         )
     else:
         logging.info(
             f"使用串行处理生成 [{len(ttc_tasks)}/{len(ttc_groups)}] 个 TTC 文件"
         )
-        success_count, failed_count = _batch_generate_ttc_serial(ttc_tasks)
+        succeeded, failed_count = _batch_generate_ttc_serial(ttc_tasks)
 
-    logging.info(f"TTC 生成完成 - 成功: {success_count}, 失败: {failed_count}")
+    logging.info(f"TTC 生成完成 - 成功: {len(succeeded)}, 失败: {failed_count}")
 
     # 检查是否成功生成了所有TTC文件
-    if success_count == 0:
+    if not succeeded:
         raise RuntimeError("未能成功生成任何TTC文件，请检查日志")
 
+    # 只缓存本次生成成功的 TTC，失败时残留的旧文件不会被存入缓存
+    for ttc_name, _, ttc_path in ttc_tasks:
+        ttc_key = get_ttc_cache_key(ttc_name, ttc_groups[ttc_name])
+        if ttc_key and ttc_name in succeeded:
+            store_in_cache(config, ttc_key, ttc_path)
 
-def _generate_single_ttc(ttc_name, ttf_paths, ttc_path):
+
+def get_ttc_cache_key(ttc_name, ttf_list):
+    """
+    由成员TTF的缓存键与TTC合并方式生成TTC缓存键。
+    任一成员没有缓存键（未启用缓存）时返回 None。
+    """
+    member_keys = [_ttf_cache_keys.get(ttf) for ttf in ttf_list]
+    if not all(member_keys):
+        return None
+    return make_cache_key(
+        "msyh-ttc",
+        ttc_name,
+        member_keys,
+        get_config_value(config, "ENABLE_TTC_TABLE_SHARING", True),
+    )
+
+
+def _generate_single_ttc(ttc_name, ttf_paths, ttc_path, share_tables=True):
     """
-    生成单个 TTC 文件的辅助函数，用于并行处理
-    返回 (ttc_name, success, duration, error_msg)
+    生成单个 TTC 文件的辅助函数，用于并行处理（线程或进程）。
+    只接收路径参数，失败时删除可能残留的不完整文件。
+    返回 (ttc_name, success, duration, error_msg, peak_rss)，peak_rss 仅在子进程中有值
     """
     start_time = time.time()
     try:
-        generate_ttc_with_fonttools(ttf_paths, ttc_path)
-        duration = time.time() - start_time
-        return (ttc_name, True, duration, "")
+        if share_tables:
+            generate_ttc_with_shared_tables(ttf_paths, ttc_path)
+        else:
+            generate_ttc_with_fonttools(ttf_paths, ttc_path)
+        success, error_msg = True, ""
     except Exception as e:
-        duration = time.time() - start_time
-        error_msg = f"{e}\n{traceback.format_exc()}"
-        return (ttc_name, False, duration, error_msg)
+        success, error_msg = False, f"{e}\n{traceback.format_exc()}"
+        if os.path.exists(ttc_path):
+            os.remove(ttc_path)
+    duration = time.time() - start_time
+    return (ttc_name, success, duration, error_msg, get_worker_peak_rss())
 
 
-def _batch_generate_ttc_parallel(ttc_tasks, max_workers):
-    """并行生成TTC文件"""
+def _batch_generate_ttc_parallel(ttc_tasks, max_workers, use_processes=False):
+    """
+    并行生成TTC文件
+    use_processes: 为 True 时使用进程池，否则使用线程池
+    返回 (生成成功的 TTC 文件名列表, 失败数)
+    """
     total = len(ttc_tasks)
-    success_count = 0
+    succeeded = []
     failed_count = 0
+    share_tables = get_config_value(config, "ENABLE_TTC_TABLE_SHARING", True)
+    executor_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
 
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+    with executor_class(max_workers=max_workers) as executor:
         futures = []
         for ttc_name, ttf_paths, ttc_path in ttc_tasks:
             future = executor.submit(
-                _generate_single_ttc, ttc_name, ttf_paths, ttc_path
+                profile_call,
+                _generate_single_ttc,
+                ttc_name,
+                ttf_paths,
+                ttc_path,
+                share_tables,
             )
             futures.append((ttc_name, future))
 
         for idx, (ttc_name, future) in enumerate(futures, 1):
             try:
-                success = future.result()
+                _, success, duration, error_msg, peak_rss = future.result()
+                record_task(
+                    ttc_name, duration, success=success, peak_rss_bytes=peak_rss
+                )
                 if success:
-                    success_count += 1
+                    succeeded.append(ttc_name)
+                    logging.debug(f"生成 {ttc_name} 完成 (用时 {duration:.2f} 秒)")
                 else:
                     failed_count += 1
+                    logging.error(f"生成 {ttc_name} 失败: {error_msg}")
                 print_progress_bar(
                     idx,
                     total,
@@ -427,21 +579,29 @@ def _batch_generate_ttc_parallel(ttc_tasks, max_workers):
                 logging.error(f"生成 {ttc_name} 失败: {e}")
 
         print()  # 进度条完成后换行
-    return success_count, failed_count
+    return succeeded, failed_count
 
 
 def _batch_generate_ttc_serial(ttc_tasks):
-    """串行生成TTC文件"""
+    """串行生成TTC文件，返回 (生成成功的 TTC 文件名列表, 失败数)"""
     total = len(ttc_tasks)
-    success_count = 0
+    succeeded = []
     failed_count = 0
 
+    share_tables = get_config_value(config, "ENABLE_TTC_TABLE_SHARING", True)
+
     for idx, (ttc_name, ttf_paths, ttc_path) in enumerate(ttc_tasks, 1):
         try:
-            if _generate_single_ttc(ttc_name, ttf_paths, ttc_path):
-                success_count += 1
+            _, success, duration, error_msg, _ = _generate_single_ttc(
+                ttc_name, ttf_paths, ttc_path, share_tables
+            )
+            record_task(ttc_name, duration, success=success)
+            if success:
+                succeeded.append(ttc_name)
+                logging.debug(f"生成 {ttc_name} 完成 (用时 {duration:.2f} 秒)")
             else:
                 failed_count += 1
+                logging.error(f"生成 {ttc_name} 失败: {error_msg}")
             print_progress_bar(
                 idx, total, prefix="生成TTC文件", suffix=f"{ttc_name} ({idx}/{total})"
             )
@@ -450,11 +610,11 @@ def _batch_generate_ttc_serial(ttc_tasks):
             logging.error(f"生成 {ttc_name} 失败: {e}")
 
     print()  # 进度条完成后换行
-    return success_count, failed_count
+    return succeeded, failed_count
 
 
 def copy_result_files(result_dir):
-    """复制生成的TTC文件到结果目录"""
+    """把生成的TTC文件发布到结果目录（优先硬链接，见 publish_result）"""
     ttc_files = list(get_ttc_groups().keys())
     total = len(ttc_files)
     logging.info(f"开始复制 {total} 个 TTC 文件到结果目录")
@@ -463,7 +623,7 @@ def copy_result_files(result_dir):
         src = os.path.join(get_config_value(config, "TEMP_DIR", "./temp"), ttc_name)
         dst = os.path.join(result_dir, ttc_name)
         try:
-            safe_copy(src, dst)
+            publish_result(config, src, dst)
             print_progress_bar(
                 idx, total, prefix="复制TTC文件", suffix=f"{ttc_name} ({idx}/{total})"
             )
@@ -477,7 +637,7 @@ def copy_result_files(result_dir):
 
 
 def copy_individual_ttf_to_result(result_dir):
-    """复制单独的TTF文件到结果目录"""
+    """把单独的TTF文件发布到结果目录（优先硬链接，见 publish_result）"""
     if not get_config_value(config, "INCLUDE_INDIVIDUAL_TTF", True):
         return
 
@@ -489,7 +649,7 @@ def copy_individual_ttf_to_result(result_dir):
         try:
             src = os.path.join(get_config_value(config, "TEMP_DIR", "./temp"), dst)
             dst_path = os.path.join(result_dir, dst)
-            safe_copy(src, dst_path)
+            publish_result(config, src, dst_path)
             print_progress_bar(
                 idx, total, prefix="复制独立TTF文件", suffix=f"{dst} ({idx}/{total})"
             )
@@ -502,43 +662,115 @@ def copy_individual_ttf_to_result(result_dir):
     logging.info("独立TTF文件复制完成")
 
 
-def check_ttc_generated():
-    """检查所有TTC文件是否已生成"""
-    temp_dir = get_config_value(config, "TEMP_DIR", "./temp")
+def generate_msyh_from_archives(archive_paths, result_dir):
+    """
+    直接从字体包读取源TTF，设置 name 字段后把TTC（及独立TTF）写入 result_dir，不经过 temp 目录。
+    源字体与生成的TTF都以内存中的 BytesIO 处理，按TTC分组进行，
+    源字体在最后一个用到它的目标生成后即释放。不使用构建缓存。
+    """
+    mapping = get_msyh_mapping()
+    total = len(mapping)
+    if total == 0:
+        raise RuntimeError("微软雅黑字体映射表为空，请检查配置")
+
+    sources = read_archive_members(archive_paths, {src for _, src in mapping})
+    missing = sorted({src for _, src in mapping} - set(sources))
+    if missing:
+        raise RuntimeError(f"字体包中缺少必需的源字体文件: {', '.join(missing)}")
+    logging.info(f"直接从字体包生成微软雅黑字体，共 {total} 个TTF文件")
+
+    src_of = dict(mapping)
+    remaining_uses = Counter(src for _, src in mapping)
+    include_ttf = get_config_value(config, "INCLUDE_INDIVIDUAL_TTF", True)
+    share_tables = get_config_value(config, "ENABLE_TTC_TABLE_SHARING", True)
+
+    def patch(dst):
+        src = src_of[dst]
+        src_file = io.BytesIO(sources[src])
+        try:
+            name_data = build_msyh_name_table(dst, read_table(src_file, "name"))
+            if name_data is None:
+                data = sources[src]
+            else:
+                data = replace_table(src_file, None, "name", name_data)
+        except Exception as e:
+            # 与经过 temp 目录的流程一致：保留未修改 name 的字体并继续
+            logging.warning(f"设置字体Name信息失败: {dst}, 错误: {e}")
+            data = sources[src]
+        remaining_uses[src] -= 1
+        if not remaining_uses[src]:
+            del sources[src]
+        if include_ttf:
+            with open(os.path.join(result_dir, dst), "wb") as f:
+                f.write(data)
+        return data
+
+    # 先按TTC分组生成，映射表中不属于任何TTC的目标最后单独生成
+    groups = list(get_ttc_groups().items())
+    grouped = {ttf for _, ttf_list in groups for ttf in ttf_list}
+    groups += [(None, [dst]) for dst, _ in mapping if dst not in grouped]
+    ttc_count = 0
+    for idx, (ttc_name, ttf_list) in enumerate(groups, 1):
+        start = time.time()
+        faces = [patch(ttf) for ttf in ttf_list if ttf in src_of]
+        if ttc_name and len(faces) == len(ttf_list):
+            face_files = [io.BytesIO(data) for data in faces]
+            ttc_path = os.path.join(result_dir, ttc_name)
+            if share_tables:
+                generate_ttc_with_shared_tables(face_files, ttc_path)
+            else:
+                generate_ttc_with_fonttools(face_files, ttc_path)
+            ttc_count += 1
+            record_task(ttc_name, time.time() - start, success=True)
+        elif ttc_name:
+            logging.warning(
+                f"生成 {ttc_name} 时有缺失: 映射表中只有 {len(faces)} 个，应有: {ttf_list}"
+            )
+        print_progress_bar(
+            idx,
+            len(groups),
+            prefix="直接生成微软雅黑字体",
+            suffix=f"{ttc_name or ttf_list[0]} ({idx}/{len(groups)})",
+        )
+
+    print()  # 进度条完成后换行
+    logging.info(
+        f"微软雅黑字体直接生成完成 - TTC: {ttc_count}"
+        + (f", 独立TTF: {total}" if include_ttf else "")
+    )
+
+
+def check_ttc_generated(directory=None):
+    """检查所有TTC文件是否已在 directory（默认为 temp 目录）中生成"""
+    if directory is None:
+        directory = get_config_value(config, "TEMP_DIR", "./temp")
     ttc_files = list(get_ttc_groups().keys())
-    return all(os.path.exists(os.path.join(temp_dir, f)) for f in ttc_files)
+    return all(os.path.exists(os.path.join(directory, f)) for f in ttc_files)
 
 
 if __name__ == "__main__":
     if len(sys.argv) > 1:
         arg = sys.argv[1].lower()
         if arg == "batch_msyh":
-            batch_copy_msyh_ttf()
-            batch_patch_names()
+            batch_copy_and_patch_msyh_ttf()
             batch_generate_ttc()
         elif arg == "gen_regular":
-            batch_copy_msyh_ttf()
-            batch_patch_names()
+            batch_copy_and_patch_msyh_ttf()
             batch_generate_ttc(["msyh.ttc"])
         elif arg == "gen_bold":
-            batch_copy_msyh_ttf()
-            batch_patch_names()
+            batch_copy_and_patch_msyh_ttf()
             batch_generate_ttc(["msyhbd.ttc"])
         elif arg == "gen_light":
-            batch_copy_msyh_ttf()
-            batch_patch_names()
+            batch_copy_and_patch_msyh_ttf()
             batch_generate_ttc(["msyhl.ttc"])
         elif arg == "gen_extralight":
-            batch_copy_msyh_ttf()
-            batch_patch_names()
+            batch_copy_and_patch_msyh_ttf()
             batch_generate_ttc(["msyhxl.ttc"])
         elif arg == "gen_semibold":
-            batch_copy_msyh_ttf()
-            batch_patch_names()
+            batch_copy_and_patch_msyh_ttf()
             batch_generate_ttc(["msyhsb.ttc"])
         else:
             print(f"未知参数: {arg}")
     else:
-        batch_copy_msyh_ttf()
-        batch_patch_names()
+        batch_copy_and_patch_msyh_ttf()
         batch_generate_ttc()
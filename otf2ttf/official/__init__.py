@@ -3,6 +3,8 @@
 这个包封装了来自 FontTools 的官方 otf2ttf 实现
 """
 
-from .otf2ttf import MAX_ERR, TTFont, otf_to_ttf, update_hmtx
+from .otf2ttf import (MAX_ERR, TTFont, family_otf_to_ttf, otf_to_ttf,
+                      sharded_glyphs_to_quadratic, update_hmtx)
 
-__all__ = ['MAX_ERR', 'TTFont', 'otf_to_ttf', 'update_hmtx'] 
+__all__ = ['MAX_ERR', 'TTFont', 'family_otf_to_ttf', 'otf_to_ttf',
+           'sharded_glyphs_to_quadratic', 'update_hmtx'] 
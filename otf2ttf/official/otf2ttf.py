@@ -4,12 +4,16 @@ import argparse
 import logging
 import os
 import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 
 from fontTools import configLogger
 from fontTools.misc.cliTools import makeOutputFileName
-from fontTools.pens.cu2quPen import Cu2QuPen
+from fontTools.pens.cu2quPen import Cu2QuMultiPen, Cu2QuPen
+from fontTools.pens.recordingPen import RecordingPen
 from fontTools.pens.ttGlyphPen import TTGlyphPen
-from fontTools.ttLib import TTFont, newTable
+from fontTools.ttLib import TTCollection, TTFont, newTable
 
 log = logging.getLogger()
 
@@ -24,9 +28,11 @@ POST_FORMAT = 2.0
 REVERSE_DIRECTION = True
 
 
-def glyphs_to_quadratic(glyphs, max_err=MAX_ERR, reverse_direction=REVERSE_DIRECTION):
+def glyphs_to_quadratic(
+    glyphs, max_err=MAX_ERR, reverse_direction=REVERSE_DIRECTION, glyphNames=None
+):
     quadGlyphs = {}
-    for gname in glyphs.keys():
+    for gname in glyphs.keys() if glyphNames is None else glyphNames:
         glyph = glyphs[gname]
         ttPen = TTGlyphPen(glyphs)
         cu2quPen = Cu2QuPen(ttPen, max_err, reverse_direction=reverse_direction)
@@ -35,6 +41,131 @@ def glyphs_to_quadratic(glyphs, max_err=MAX_ERR, reverse_direction=REVERSE_DIREC
     return quadGlyphs
 
 
+def _outlines_compatible(recordings):
+    # every master must issue the same drawing commands with the same
+    # number of points; curveTo must be a single cubic segment
+    first = recordings[0]
+    for other in recordings[1:]:
+        if len(other) != len(first):
+            return False
+        for (op, args), (other_op, other_args) in zip(first, other):
+            if op != other_op or len(args) != len(other_args):
+                return False
+    return all(op != "curveTo" or len(args) == 3 for op, args in first)
+
+
+def glyphs_to_quadratic_compatible(
+    glyphSets, max_err=MAX_ERR, reverse_direction=REVERSE_DIRECTION
+):
+    """Convert the same glyphs of several fonts (e.g. the weights of one
+    family) together, so that compatible outlines stay point-compatible and
+    each curve set is split only once. Glyphs whose outlines are not
+    compatible, or that are missing from some font, fall back to the
+    per-font conversion. Returns one {glyphName: Glyph} dict per font.
+    """
+    quadGlyphSets = [{} for _ in glyphSets]
+    for gname in glyphSets[0].keys():
+        if not all(gname in glyphs for glyphs in glyphSets):
+            continue
+        recordings = []
+        for glyphs in glyphSets:
+            recPen = RecordingPen()
+            glyphs[gname].draw(recPen)
+            recordings.append(recPen.value)
+        if not _outlines_compatible(recordings):
+            continue
+        ttPens = [TTGlyphPen(glyphs) for glyphs in glyphSets]
+        multiPen = Cu2QuMultiPen(ttPens, max_err, reverse_direction=reverse_direction)
+        for segments in zip(*recordings):
+            op = segments[0][0]
+            if op in ("closePath", "endPath"):
+                getattr(multiPen, op)()
+            elif op == "addComponent":
+                multiPen.addComponent(
+                    segments[0][1][0], [args[1] for _, args in segments]
+                )
+            else:
+                getattr(multiPen, op)([args for _, args in segments])
+        for quadGlyphs, ttPen in zip(quadGlyphSets, ttPens):
+            quadGlyphs[gname] = ttPen.glyph()
+
+    # per-font fallback for everything not converted above
+    for glyphs, quadGlyphs in zip(glyphSets, quadGlyphSets):
+        for gname in glyphs.keys():
+            if gname in quadGlyphs:
+                continue
+            ttPen = TTGlyphPen(glyphs)
+            cu2quPen = Cu2QuPen(ttPen, max_err, reverse_direction=reverse_direction)
+            glyphs[gname].draw(cu2quPen)
+            quadGlyphs[gname] = ttPen.glyph()
+    return quadGlyphSets
+
+
+def _glyph_shard_to_quadratic(path, fontNumber, glyphNames, max_err, reverse_direction):
+    # runs in a worker process: each worker opens the font itself so that
+    # only glyph names go in and converted glyphs come back
+    ttFont = TTFont(path, fontNumber=fontNumber, lazy=True)
+    try:
+        return glyphs_to_quadratic(
+            ttFont.getGlyphSet(),
+            max_err=max_err,
+            reverse_direction=reverse_direction,
+            glyphNames=glyphNames,
+        )
+    finally:
+        ttFont.close()
+
+
+def _map_tasks(executor, func, *iterables, task_runner=None):
+    # task_runner(func, *args) runs each task in the worker instead of
+    # func(*args), e.g. to profile the worker processes
+    if task_runner is None:
+        return executor.map(func, *iterables)
+    return executor.map(task_runner, repeat(func), *iterables)
+
+
+def sharded_glyphs_to_quadratic(
+    path,
+    fontNumber=0,
+    workers=None,
+    max_err=MAX_ERR,
+    reverse_direction=REVERSE_DIRECTION,
+    shards_per_worker=4,
+    task_runner=None,
+):
+    """Convert the glyphs of a single (large) CFF font on a process pool.
+    The glyph order is split into contiguous shards, several per worker so
+    that slow shards do not leave the other workers idle, and the resulting
+    glyphs are merged in the parent. Returns {glyphName: Glyph}.
+    task_runner, if given, is called as task_runner(func, *args) in the
+    workers in place of func(*args).
+    """
+    workers = workers or os.cpu_count() or 1
+    ttFont = TTFont(path, fontNumber=fontNumber, lazy=True)
+    glyphOrder = ttFont.getGlyphOrder()
+    ttFont.close()
+
+    numShards = max(1, min(len(glyphOrder), workers * shards_per_worker))
+    shardSize = -(-len(glyphOrder) // numShards)
+    shards = [
+        glyphOrder[i : i + shardSize] for i in range(0, len(glyphOrder), shardSize)
+    ]
+    quadGlyphs = {}
+    with ProcessPoolExecutor(max_workers=min(workers, len(shards))) as executor:
+        for shardGlyphs in _map_tasks(
+            executor,
+            _glyph_shard_to_quadratic,
+            repeat(path),
+            repeat(fontNumber),
+            shards,
+            repeat(max_err),
+            repeat(reverse_direction),
+            task_runner=task_runner,
+        ):
+            quadGlyphs.update(shardGlyphs)
+    return quadGlyphs
+
+
 def update_hmtx(ttFont, glyf):
     hmtx = ttFont["hmtx"]
     for glyphName, glyph in glyf.glyphs.items():
@@ -42,18 +173,25 @@ def update_hmtx(ttFont, glyf):
             hmtx[glyphName] = (hmtx[glyphName][0], glyph.xMin)
 
 
-def otf_to_ttf(ttFont, post_format=POST_FORMAT, **kwargs):
+def otf_to_ttf(ttFont, post_format=POST_FORMAT, quadGlyphs=None, **kwargs):
     assert ttFont.sfntVersion == "OTTO"
     assert "CFF " in ttFont
 
     glyphOrder = ttFont.getGlyphOrder()
 
+    if quadGlyphs is None:
+        quadGlyphs = glyphs_to_quadratic(ttFont.getGlyphSet(), **kwargs)
     ttFont["loca"] = newTable("loca")
     ttFont["glyf"] = glyf = newTable("glyf")
     glyf.glyphOrder = glyphOrder
-    glyf.glyphs = glyphs_to_quadratic(ttFont.getGlyphSet(), **kwargs)
+    glyf.glyphs = quadGlyphs
     del ttFont["CFF "]
-    glyf.compile(ttFont)
+    # Compute each glyph's bounds exactly once; the glyphs themselves are
+    # packed only once, when the font is saved.
+    for glyphName in glyphOrder:
+        glyph = quadGlyphs[glyphName]
+        if glyph.numberOfContours:
+            glyph.recalcBounds(glyf)
     update_hmtx(ttFont, glyf)
 
     ttFont["maxp"] = maxp = newTable("maxp")
@@ -65,11 +203,9 @@ def otf_to_ttf(ttFont, post_format=POST_FORMAT, **kwargs):
     maxp.maxInstructionDefs = 0
     maxp.maxStackElements = 0
     maxp.maxSizeOfInstructions = 0
-    maxp.maxComponentElements = max(
-        len(g.components if hasattr(g, "components") else [])
-        for g in glyf.glyphs.values()
-    )
-    maxp.compile(ttFont)
+    # also sets the head bbox from the glyph bounds computed above
+    maxp.recalc(ttFont)
+    ttFont["hhea"].recalc(ttFont)
 
     post = ttFont["post"]
     post.formatType = post_format
@@ -83,6 +219,174 @@ def otf_to_ttf(ttFont, post_format=POST_FORMAT, **kwargs):
         log.warning("Dropping glyph names, they do not fit in 'post' table.")
 
     ttFont.sfntVersion = "\000\001\000\000"
+    # Bounds, maxp and hhea are final now; don't let save() recompute them.
+    # Callers that edit outlines afterwards must turn this back on.
+    ttFont.recalcBBoxes = False
+
+
+def family_otf_to_ttf(ttFonts, post_format=POST_FORMAT, **kwargs):
+    """Convert several CFF fonts of one family in a single pass, keeping
+    compatible glyphs point-compatible across the fonts."""
+    for ttFont in ttFonts:
+        assert ttFont.sfntVersion == "OTTO"
+        assert "CFF " in ttFont
+    quadGlyphSets = glyphs_to_quadratic_compatible(
+        [ttFont.getGlyphSet() for ttFont in ttFonts], **kwargs
+    )
+    for ttFont, quadGlyphs in zip(ttFonts, quadGlyphSets):
+        otf_to_ttf(ttFont, post_format=post_format, quadGlyphs=quadGlyphs)
+
+
+def is_font_collection(path):
+    with open(path, "rb") as f:
+        return f.read(4) == b"ttcf"
+
+
+def collection_face_output(path, fontNumber, outputDir=None):
+    """Output path for one face of a collection: <stem>_<index>.ttf"""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    outputDir = os.path.dirname(path) if outputDir is None else outputDir
+    return os.path.join(outputDir, f"{stem}_{fontNumber}.ttf")
+
+
+def collection_face_groups(path):
+    """Return the face indices of a font collection grouped by the offset of
+    their outline table, so that faces sharing one CFF (e.g. the language
+    variants of a Source Han OTC) are converted together.
+    """
+    collection = TTCollection(path, lazy=True)
+    groups = {}
+    try:
+        for fontNumber, font in enumerate(collection.fonts):
+            tag = "CFF " if "CFF " in font.reader else "glyf"
+            offset = font.reader.tables[tag].offset if tag in font.reader else None
+            groups.setdefault((tag, offset), []).append(fontNumber)
+    finally:
+        collection.close()
+    return list(groups.values())
+
+
+def _collection_faces_to_ttf(
+    path, fontNumbers, outputs, post_format, max_err, reverse_direction
+):
+    # runs in a worker process: the shared CFF is parsed and converted once
+    # and the resulting glyphs are reused for every face of the group
+    quadGlyphs = None
+    for fontNumber, output in zip(fontNumbers, outputs):
+        font = TTFont(path, fontNumber=fontNumber)
+        if font.sfntVersion == "OTTO":
+            if quadGlyphs is None:
+                quadGlyphs = glyphs_to_quadratic(
+                    font.getGlyphSet(),
+                    max_err=max_err,
+                    reverse_direction=reverse_direction,
+                )
+            otf_to_ttf(font, post_format=post_format, quadGlyphs=quadGlyphs)
+        font.save(output)
+        font.close()
+    return outputs
+
+
+def collection_to_ttf(
+    path,
+    outputs,
+    fontNumbers=None,
+    workers=None,
+    ttc_output=None,
+    post_format=POST_FORMAT,
+    max_err=MAX_ERR,
+    reverse_direction=REVERSE_DIRECTION,
+    task_runner=None,
+):
+    """Convert the faces of an OTC/TTC to TrueType-flavored fonts.
+    outputs maps each face index to its output path; fontNumbers selects the
+    faces (default: all of them). Groups of faces sharing a CFF are fanned
+    out to a process pool. If ttc_output is given, the converted faces are
+    also written into a single TTC there. Returns the list of written paths.
+    task_runner is passed on as in sharded_glyphs_to_quadratic.
+    """
+    selected = None if fontNumbers is None else set(fontNumbers)
+    tasks = []
+    for group in collection_face_groups(path):
+        group = [i for i in group if selected is None or i in selected]
+        if group:
+            tasks.append((group, [outputs[i] for i in group]))
+    if not tasks:
+        return []
+
+    written = []
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for result in _map_tasks(
+                executor,
+                _collection_faces_to_ttf,
+                repeat(path),
+                [group for group, _ in tasks],
+                [groupOutputs for _, groupOutputs in tasks],
+                repeat(post_format),
+                repeat(max_err),
+                repeat(reverse_direction),
+                task_runner=task_runner,
+            ):
+                written.extend(result)
+    else:
+        for group, groupOutputs in tasks:
+            written.extend(
+                _collection_faces_to_ttf(
+                    path,
+                    group,
+                    groupOutputs,
+                    post_format,
+                    max_err,
+                    reverse_direction,
+                )
+            )
+
+    if ttc_output is not None:
+        # keep the collection's face order
+        written = [outputs[i] for i in sorted(outputs) if outputs[i] in written]
+        collection = TTCollection()
+        collection.fonts = [TTFont(output, lazy=True) for output in written]
+        collection.save(ttc_output, shareTables=True)
+        for font in collection.fonts:
+            font.close()
+        written = [ttc_output]
+    return written
+
+
+def convert_collection_cli(path, options):
+    outputFile = (
+        options.output if options.output and not os.path.isdir(options.output) else None
+    )
+    outputDir = None if outputFile else options.output
+    fontNumbers = None if options.face_index is None else [options.face_index]
+    kwargs = dict(
+        fontNumbers=fontNumbers,
+        workers=options.jobs,
+        post_format=options.post_format,
+        max_err=options.max_error,
+        reverse_direction=options.reverse_direction,
+    )
+    numFonts = sum(len(group) for group in collection_face_groups(path))
+
+    if not options.ttc:
+        outputs = {
+            i: collection_face_output(path, i, outputDir) for i in range(numFonts)
+        }
+        if outputFile and fontNumbers:
+            outputs[options.face_index] = outputFile
+        return collection_to_ttf(path, outputs, **kwargs)
+
+    ttcOutput = outputFile or makeOutputFileName(
+        path,
+        outputDir=outputDir,
+        extension=".ttc",
+        overWrite=options.overwrite,
+    )
+    with tempfile.TemporaryDirectory() as tmpDir:
+        outputs = {i: collection_face_output(path, i, tmpDir) for i in range(numFonts)}
+        return collection_to_ttf(path, outputs, ttc_output=ttcOutput, **kwargs)
 
 
 def main(args=None):
@@ -96,7 +400,18 @@ def main(args=None):
     parser.add_argument(
         "--keep-direction", dest="reverse_direction", action="store_false"
     )
-    parser.add_argument("--face-index", type=int, default=0)
+    parser.add_argument(
+        "--face-index",
+        type=int,
+        default=None,
+        help="convert only this face of a collection (default: all faces)",
+    )
+    parser.add_argument(
+        "--ttc",
+        action="store_true",
+        help="write the converted faces of a collection as one TTC",
+    )
+    parser.add_argument("-j", "--jobs", type=int, default=None)
     parser.add_argument("--overwrite", action="store_true")
     options = parser.parse_args(args)
 
@@ -108,6 +423,10 @@ def main(args=None):
             )
 
     for path in options.input:
+        if is_font_collection(path):
+            convert_collection_cli(path, options)
+            continue
+
         if options.output and not os.path.isdir(options.output):
             output = options.output
         else:
@@ -118,7 +437,7 @@ def main(args=None):
                 overWrite=options.overwrite,
             )
 
-        font = TTFont(path, fontNumber=options.face_index)
+        font = TTFont(path)
         otf_to_ttf(
             font,
             post_format=options.post_format,
@@ -1,13 +1,26 @@
+import io
 import json
 import logging
 import os
+import time
 
-from fontTools.ttLib import TTFont
+from fontTools.ttLib import newTable
 from fontTools.ttLib.tables._n_a_m_e import NameRecord
 
+from utils.archive import read_archive_members
+from utils.build_cache import (
+    hash_file,
+    make_cache_key,
+    restore_from_cache,
+    store_in_cache,
+)
 from utils.config import get_config_value, load_config
 from utils.file_ops import find_font_file, safe_copy
+from utils.parallel import run_in_order
 from utils.progress import print_progress_bar
+from utils.result_manager import publish_result
+from utils.sfnt import replace_table
+from utils.timing import get_worker_peak_rss, record_task
 
 # 加载配置
 config = load_config()
@@ -59,12 +72,14 @@ def get_segoe_mapping():
     return SEGOE_MAPPING_LOOSE
 
 
-def copy_font_info(dst, info_json):
-    """复制字体信息到目标文件"""
+def copy_font_info(dst, info_json, src=None):
+    """
+    复制字体信息到目标文件。
+    只重写 name 表，其余表按原始字节复制；src 不为空时从 src 读取并写入 dst。
+    """
     try:
-        font = TTFont(dst)
-        name_table = font["name"]
-        name_table.names.clear()
+        name_table = newTable("name")
+        name_table.names = []
         for field in info_json.get("name_fields", []):
             parts = dict(
                 item.strip().split("=", 1) for item in field.split(",") if "=" in item
@@ -76,7 +91,7 @@ def copy_font_info(dst, info_json):
             rec.langID = int(parts.get("Lang", 0))
             rec.string = parts.get("Value", "").encode("utf-16-be")
             name_table.names.append(rec)
-        font.save(dst)
+        replace_table(src or dst, dst, "name", name_table.compile(None))
     except Exception as e:
         logging.error(f"设置字体信息失败: {dst}")
         raise RuntimeError(f"设置字体信息失败: {dst}") from e
@@ -101,8 +116,29 @@ def load_font_info():
         raise RuntimeError(f"字体信息文件解析失败: {e}") from None
 
 
-def batch_rename_and_patch():
-    """批量重命名和修补字体文件"""
+def _rename_and_patch_worker(segoe_name, inter_path, segoe_out, info):
+    """
+    在子进程中运行的单个字体处理函数：写入设置好字体信息的 Segoe UI 字体。
+    返回 (segoe_name, success: bool, duration: float, error_msg: str, peak_rss: int|None)
+    """
+    start = time.time()
+    try:
+        if info:
+            copy_font_info(segoe_out, info, src=inter_path)
+        else:
+            safe_copy(inter_path, segoe_out)
+        success, error_msg = True, ""
+    except Exception as e:
+        success, error_msg = False, str(e)
+    return (segoe_name, success, time.time() - start, error_msg, get_worker_peak_rss())
+
+
+def batch_rename_and_patch(use_parallel=None, max_workers=None):
+    """
+    批量重命名和修补字体文件
+    use_parallel: 是否使用多进程并行处理，为 None 时从配置文件读取
+    max_workers: 最大工作进程数，为 None 时从配置文件读取
+    """
     info_map = load_font_info()
     mapping = get_segoe_mapping()
     temp_dir = get_config_value(config, "TEMP_DIR", "./temp")
@@ -112,37 +148,107 @@ def batch_rename_and_patch():
         raise RuntimeError("Segoe UI字体映射表为空，请检查配置")
 
     logging.info(f"开始处理 {total} 个 Segoe UI 字体文件")
-    processed_count = 0
+    cached_count = 0
+    use_cache = get_config_value(config, "ENABLE_BUILD_CACHE", False)
 
-    for idx, (segoe_name, inter_name) in enumerate(mapping, 1):
+    # 查找源字体并处理缓存命中，未命中的加入任务列表
+    tasks = []
+    cache_keys = {}
+    for segoe_name, inter_name in mapping:
         try:
             rel_inter_path = find_font_file(temp_dir, inter_name)
-            inter_path = os.path.join(temp_dir, rel_inter_path)
-            segoe_out = os.path.join(temp_dir, segoe_name)
-            safe_copy(inter_path, segoe_out)
-
-            info = info_map.get(segoe_name.lower())
-            if info:
-                copy_font_info(segoe_out, info)
-            processed_count += 1
-            print_progress_bar(
-                idx,
-                total,
-                prefix="处理Segoe UI字体",
-                suffix=f"{segoe_name} ({idx}/{total})",
-            )
-            logging.debug(f"处理成功: {inter_name} -> {segoe_name}")
         except Exception as e:
-            print()  # 清理进度条
             logging.error(f"处理失败: {inter_name} -> {segoe_name}, 错误: {e}")
             raise RuntimeError(f"处理字体文件失败: {segoe_name}") from e
+        inter_path = os.path.join(temp_dir, rel_inter_path)
+        segoe_out = os.path.join(temp_dir, segoe_name)
+        info = info_map.get(segoe_name.lower())
+
+        if use_cache:
+            cache_key = make_cache_key(
+                "segoe-ttf", segoe_name, hash_file(inter_path), info
+            )
+            cache_keys[segoe_name] = cache_key
+            if restore_from_cache(config, cache_key, segoe_out):
+                cached_count += 1
+                continue
+        tasks.append((segoe_name, inter_path, segoe_out, info))
+
+    if use_parallel is None:
+        use_parallel = get_config_value(config, "ENABLE_PARALLEL_NAME_PATCHING", True)
+    if max_workers is None:
+        max_workers = get_config_value(config, "MAX_PARALLEL_PATCH_WORKERS", None)
+
+    failed = []
+    for idx, (segoe_name, success, duration, error_msg, peak_rss) in enumerate(
+        run_in_order(_rename_and_patch_worker, tasks, use_parallel, max_workers), 1
+    ):
+        record_task(segoe_name, duration, success=success, peak_rss_bytes=peak_rss)
+        if success:
+            if segoe_name in cache_keys:
+                store_in_cache(
+                    config, cache_keys[segoe_name], os.path.join(temp_dir, segoe_name)
+                )
+            logging.debug(f"处理成功: {segoe_name} (用时 {duration:.2f} 秒)")
+        else:
+            failed.append(segoe_name)
+            print()  # 清理进度条
+            logging.error(f"处理失败: {segoe_name}, 错误: {error_msg}")
+        print_progress_bar(
+            idx,
+            len(tasks),
+            prefix="处理Segoe UI字体",
+            suffix=f"{segoe_name} ({idx}/{len(tasks)})",
+        )
+
+    print()  # 进度条完成后换行
+    if failed:
+        raise RuntimeError(f"处理字体文件失败: {', '.join(failed)}")
+    logging.info(f"Segoe UI字体处理完成 - 成功: {total}, 其中来自缓存: {cached_count}")
+
+
+def generate_segoe_from_archives(archive_paths, result_dir):
+    """
+    直接从字体包读取源字体，设置字体信息后写入 result_dir，不经过 temp 目录。
+    源字体以内存中的 BytesIO 处理，不使用构建缓存。
+    """
+    info_map = load_font_info()
+    mapping = get_segoe_mapping()
+    total = len(mapping)
+    if total == 0:
+        raise RuntimeError("Segoe UI字体映射表为空，请检查配置")
+
+    sources = read_archive_members(
+        archive_paths, {inter_name for _, inter_name in mapping}
+    )
+    missing = sorted({inter_name for _, inter_name in mapping} - set(sources))
+    if missing:
+        raise RuntimeError(f"字体包中缺少必需的源字体文件: {', '.join(missing)}")
+
+    logging.info(f"直接从字体包生成 {total} 个 Segoe UI 字体文件")
+    for idx, (segoe_name, inter_name) in enumerate(mapping, 1):
+        start = time.time()
+        segoe_out = os.path.join(result_dir, segoe_name)
+        info = info_map.get(segoe_name.lower())
+        if info:
+            copy_font_info(segoe_out, info, src=io.BytesIO(sources[inter_name]))
+        else:
+            with open(segoe_out, "wb") as f:
+                f.write(sources[inter_name])
+        record_task(segoe_name, time.time() - start, success=True)
+        print_progress_bar(
+            idx,
+            total,
+            prefix="处理Segoe UI字体",
+            suffix=f"{segoe_name} ({idx}/{total})",
+        )
 
     print()  # 进度条完成后换行
-    logging.info(f"Segoe UI字体处理完成 - 成功: {processed_count}")
+    logging.info(f"Segoe UI字体直接生成完成 - 成功: {total}")
 
 
 def copy_result_files(result_dir):
-    """复制生成的字体文件到结果目录"""
+    """把生成的字体文件发布到结果目录（优先硬链接，见 publish_result）"""
     mapping = get_segoe_mapping()
     total = len(mapping)
     if total == 0:
@@ -157,7 +263,7 @@ def copy_result_files(result_dir):
                 get_config_value(config, "TEMP_DIR", "./temp"), segoe_name
             )
             dst = os.path.join(result_dir, segoe_name)
-            safe_copy(src, dst)
+            publish_result(config, src, dst)
             copied_count += 1
             print_progress_bar(
                 idx,
@@ -2,10 +2,15 @@ import logging
 
 import fetch_inter as inter
 import segoe_generate
-from utils.archive import extract_custom_font_packages
+from utils.archive import (
+    can_read_directly,
+    extract_custom_font_packages,
+    get_custom_package_paths,
+)
 from utils.cleanup import clean_temp_dir
 from utils.config import get_config_value
 from utils.file_ops import create_directories
+from utils.timing import span
 
 
 def generate_segoe_ui(config, result_subdir):
@@ -14,19 +19,48 @@ def generate_segoe_ui(config, result_subdir):
     # 确保目录存在
     create_directories(config)
 
+    custom_mode = get_config_value(config, "FONT_PACKAGE_SOURCE", "local") == "custom"
+    direct = get_config_value(config, "ENABLE_DIRECT_ARCHIVE_READ", False)
+    if direct and not can_read_directly(
+        src for _, src in segoe_generate.get_segoe_mapping()
+    ):
+        logging.info("映射表中有非 TTF 源字体，不能直接读取字体包，改为解压到临时目录")
+        direct = False
+    if direct:
+        # 直接从字体包读取源字体，结果直接写入结果目录，不使用 temp 目录
+        try:
+            with span("segoe.direct"):
+                if custom_mode:
+                    archive_paths = get_custom_package_paths(config)
+                else:
+                    archive_paths = [inter.fetch_inter(extract=False)]
+                segoe_generate.generate_segoe_from_archives(
+                    archive_paths, result_subdir
+                )
+        except Exception as e:
+            logging.error(f"直接从字体包生成Segoe UI字体失败: {e}")
+            raise
+        logging.info("Segoe UI字体处理完成")
+        return
+
     # custom 模式下直接用 config.yaml 指定的自定义英文字体包
-    if get_config_value(config, "FONT_PACKAGE_SOURCE", "local") == "custom":
+    if custom_mode:
         # 若 temp 目录下未解压则主动解压一次
         try:
-            extract_custom_font_packages(config)
+            with span("segoe.extract"):
+                extract_custom_font_packages(config)
             logging.info("自定义字体包解压完成")
         except Exception as e:
             logging.error(f"自定义字体包解压失败: {e}")
             raise
     else:
         # 下载并解压Inter
+        targets = None
+        if get_config_value(config, "ENABLE_SELECTIVE_EXTRACTION", True):
+            targets = {src for _, src in segoe_generate.get_segoe_mapping()}
         try:
-            inter.fetch_inter()
+            with span("segoe.fetch"):
+                inter.fetch_inter(targets=targets)
             logging.info("Inter字体包下载并解压完成")
         except Exception as e:
             logging.error(f"Inter字体包获取失败: {e}")
@@ -34,14 +68,16 @@ def generate_segoe_ui(config, result_subdir):
 
     # 调用segoe_generate模块处理字体生成
     try:
-        segoe_generate.batch_rename_and_patch()
+        with span("segoe.patch_names"):
+            segoe_generate.batch_rename_and_patch()
     except Exception as e:
         logging.error(f"Segoe UI字体生成失败: {e}")
         raise
 
     # 复制结果文件
     try:
-        segoe_generate.copy_result_files(result_subdir)
+        with span("segoe.copy_result"):
+            segoe_generate.copy_result_files(result_subdir)
     except Exception as e:
         logging.error(f"Segoe UI字体复制失败: {e}")
         raise
@@ -4,26 +4,49 @@
 """
 
 from .config import load_config, validate_config, get_config_value
-from .file_ops import ensure_dir_exists, create_directories, safe_copy, find_font_file
+from .file_ops import ensure_dir_exists, create_directories, safe_copy, publish_file, find_font_file, build_font_index, invalidate_font_index
 from .archive import extract_archive, extract_custom_font_packages
 from .font_converter import convert_otf_to_ttf, batch_convert_otf_to_ttf, update_mapping_otf_to_ttf, process_custom_font_packages
-from .result_manager import get_new_result_dir, write_version_report
+from .result_manager import get_new_result_dir, get_failed_run_dir, write_version_report, publish_result
+from .result_store import store_result_files, gc_results, load_manifest
 from .cleanup import clean_temp_dir
 from .progress import print_progress_bar
+from .sfnt import read_tables, read_table, build_collection, replace_table
+from .parallel import run_in_order
+from .digest import file_sha256, read_cached_digest, write_cached_digest
+from .downloader import get_session, download_file, list_downloaded_files
+from .build_cache import hash_file, make_cache_key, restore_from_cache, store_in_cache
+from .timing import span, record_task, get_spans, reset_timings, write_timings
+from .profiling import configure_profiling, profile_call, collect_profiles
 
 __all__ = [
     # 配置管理
     'load_config', 'validate_config', 'get_config_value',
     # 文件操作
-    'ensure_dir_exists', 'create_directories', 'safe_copy', 'find_font_file',
+    'ensure_dir_exists', 'create_directories', 'safe_copy', 'publish_file', 'find_font_file', 'build_font_index', 'invalidate_font_index',
     # 压缩解压
     'extract_archive', 'extract_custom_font_packages',
     # 字体转换
     'convert_otf_to_ttf', 'batch_convert_otf_to_ttf', 'update_mapping_otf_to_ttf', 'process_custom_font_packages',
     # 结果管理
-    'get_new_result_dir', 'write_version_report',
+    'get_new_result_dir', 'get_failed_run_dir', 'write_version_report', 'publish_result',
+    'store_result_files', 'gc_results', 'load_manifest',
     # 清理工具
     'clean_temp_dir',
     # 进度显示
     'print_progress_bar',
+    # SFNT 底层读写
+    'read_tables', 'read_table', 'build_collection', 'replace_table',
+    # 文件摘要
+    'file_sha256', 'read_cached_digest', 'write_cached_digest',
+    # 下载
+    'get_session', 'download_file', 'list_downloaded_files',
+    # 并行处理
+    'run_in_order',
+    # 构建缓存
+    'hash_file', 'make_cache_key', 'restore_from_cache', 'store_in_cache',
+    # 耗时统计
+    'span', 'record_task', 'get_spans', 'reset_timings', 'write_timings',
+    # 性能分析
+    'configure_profiling', 'profile_call', 'collect_profiles',
 ] 
\ No newline at end of file
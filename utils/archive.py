@@ -3,84 +3,409 @@
 负责zip和7z格式文件的解压操作
 """
 
+import json
+import logging
 import os
+import shutil
+import tempfile
 import zipfile
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 
 import py7zr as sz
+from py7zr.io import BytesIOFactory
 
+from .config import get_config_value
+from .digest import file_sha256
 
-def extract_archive(archive_path, out_dir):
+# 流式解压时每次读写的缓冲区大小，决定了单个成员解压时的内存上限
+EXTRACT_BUFFER_SIZE = 4 * 1024 * 1024
+
+# 解压清单文件名，位于解压目标目录（TEMP_DIR）下
+EXTRACT_MANIFEST_FILENAME = ".extract_manifest.json"
+
+
+def select_members(names, targets):
+    """
+    从压缩包成员列表 names 中选出文件名（不含目录）属于 targets 的成员。
+    """
+    basenames = {os.path.basename(t) for t in targets}
+    return [
+        name
+        for name in names
+        if os.path.basename(name.replace("\\", "/").rstrip("/")) in basenames
+    ]
+
+
+def extract_archive(archive_path, out_dir, targets=None):
     """
     自动判断 zip/7z 并解压到 out_dir。
+    targets: 需要解压的字体文件名集合，为 None 时解压全部成员。
     """
     ext = os.path.splitext(archive_path)[1].lower()
-    from .file_ops import ensure_dir_exists
+    from .file_ops import ensure_dir_exists, invalidate_font_index
 
     ensure_dir_exists(out_dir)
+    # 解压会改变目录内容，使已有的文件名索引失效
+    invalidate_font_index(out_dir)
     if ext == ".zip":
         with zipfile.ZipFile(archive_path, "r") as zf:
-            zf.extractall(out_dir)
+            if targets is None:
+                zf.extractall(out_dir)
+                return
+            members = select_members(
+                [info.filename for info in zf.infolist() if not info.is_dir()],
+                targets,
+            )
+            logging.info(
+                f"{os.path.basename(archive_path)}: 按映射表解压 {len(members)} 个文件"
+            )
+            if members:
+                zf.extractall(out_dir, members=members)
     elif ext == ".7z":
         with sz.SevenZipFile(archive_path, mode="r") as archive:
-            archive.extractall(path=out_dir)
+            if targets is None:
+                archive.extractall(path=out_dir)
+                return
+            members = select_members(
+                [info.filename for info in archive.list() if not info.is_directory],
+                targets,
+            )
+            logging.info(
+                f"{os.path.basename(archive_path)}: 按映射表解压 {len(members)} 个文件"
+            )
+            if members:
+                archive.extract(path=out_dir, targets=members)
     else:
         raise RuntimeError(f"仅支持 zip/7z 格式，错误文件: {archive_path}")
 
 
-def extract_custom_font_packages(config):
+def _zip_member_name(info):
+    """修正 zip 成员文件名：未标记 UTF-8 的中文 zip 文件名按 gbk 解码"""
+    try:
+        return info.filename.encode("cp437").decode("gbk")
+    except Exception:
+        return info.filename
+
+
+def _copy_zip_member(zf, info, target_path):
+    """以固定大小的缓冲区把 zip 成员流式写入 target_path，内存占用与文件大小无关"""
+    # 临时文件名唯一，多个字体包同时写同名成员时不会互相删除对方的临时文件
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(target_path),
+        prefix=os.path.basename(target_path) + ".",
+        suffix=".part",
+    )
+    try:
+        with zf.open(info) as src, os.fdopen(fd, "wb") as dst:
+            shutil.copyfileobj(src, dst, EXTRACT_BUFFER_SIZE)
+        os.replace(tmp_path, target_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _extract_zip_streaming(pkg_path, out_dir, member_pool, names=None):
     """
-    解压 config.yaml 中指定的 CUSTOM_MS_YAHEI_PACKAGE 和 CUSTOM_SEGOE_PACKAGE 到 TEMP_DIR。
-    仅支持 zip/7z 格式。
+    把 zip 包的各成员分发到 member_pool 并行解压，返回解出的文件成员名列表。
+    names: 只解压其中的文件成员，为 None 时解压全部成员。
+    zipfile 对同一 ZipFile 的并发读取是线程安全的，解压缩时会释放 GIL。
+    """
+    with zipfile.ZipFile(pkg_path, "r") as zf:
+        members = []
+        futures = []
+        for info in zf.infolist():
+            name = _zip_member_name(info)
+            target_path = os.path.join(out_dir, name)
+            if info.is_dir():
+                os.makedirs(target_path, exist_ok=True)
+                continue
+            if names is not None and name not in names:
+                continue
+            os.makedirs(os.path.dirname(target_path), exist_ok=True)
+            members.append(name)
+            futures.append(member_pool.submit(_copy_zip_member, zf, info, target_path))
+        # 等待全部成员完成后再关闭 ZipFile，并抛出第一个错误
+        for future in futures:
+            future.result()
+    return members
+
+
+def _extract_7z(pkg_path, out_dir, names=None):
+    """
+    解压 7z 包，返回解出的文件成员名列表。names: 只解压其中的文件成员，为 None 时解压全部成员。
+    7z 为固实压缩，成员只能顺序解出；py7zr 本身即流式写入。
+    """
+    with sz.SevenZipFile(pkg_path, mode="r") as archive:
+        members = [
+            info.filename
+            for info in archive.list()
+            if not info.is_directory and (names is None or info.filename in names)
+        ]
+        if names is None:
+            archive.extractall(path=out_dir)
+        elif members:
+            archive.extract(path=out_dir, targets=members)
+    return members
+
+
+def _list_package_members(pkg_path):
+    """列出 zip/7z 字体包中的文件成员名（zip 中文文件名已修正）"""
+    if pkg_path.lower().endswith(".zip"):
+        with zipfile.ZipFile(pkg_path, "r") as zf:
+            return [
+                _zip_member_name(info) for info in zf.infolist() if not info.is_dir()
+            ]
+    with sz.SevenZipFile(pkg_path, mode="r") as archive:
+        return [info.filename for info in archive.list() if not info.is_directory]
+
+
+def _member_key(name):
+    """成员解压后的目标路径键，用于判断不同字体包是否会写同一个文件"""
+    return os.path.normcase(os.path.normpath(name.replace("\\", "/")))
+
+
+def _manifest_path(out_dir):
+    return os.path.join(out_dir, EXTRACT_MANIFEST_FILENAME)
+
+
+def _load_extract_manifest(out_dir):
+    """读取 out_dir 下的解压清单，不存在或损坏时返回空清单"""
+    try:
+        with open(_manifest_path(out_dir), encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return manifest if isinstance(manifest, dict) else {}
+
+
+def _save_extract_manifest(out_dir, manifest):
+    """原子地写入 out_dir 下的解压清单"""
+    path = _manifest_path(out_dir)
+    tmp_path = path + ".part"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logging.warning(f"写入解压清单失败: {e}")
+
+
+def _describe_extracted_members(out_dir, members):
+    """记录已解出成员的大小与修改时间，用于之后判断解压结果是否完好"""
+    described = {}
+    for name in members:
+        stat = os.stat(os.path.join(out_dir, name))
+        described[name] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    return described
+
+
+def _is_already_extracted(entry, digest, out_dir, shared=frozenset()):
+    """
+    清单记录 entry 是否与压缩包当前内容一致，且记录的成员仍完好地留在 out_dir 中
+    （文件存在，大小与修改时间未变）。
+    shared: 多个字体包共有的成员路径键，会被其他字体包覆盖，只检查是否存在。
+    """
+    if not entry or entry.get("sha256") != digest:
+        return False
+    for name, record in entry.get("members", {}).items():
+        try:
+            stat = os.stat(os.path.join(out_dir, name))
+        except OSError:
+            return False
+        if _member_key(name) in shared:
+            continue
+        if stat.st_size != record.get("size") or stat.st_mtime_ns != record.get(
+            "mtime_ns"
+        ):
+            return False
+    return True
+
+
+def get_custom_package_paths(config):
+    """
+    返回 config.yaml 中指定的 CUSTOM_MS_YAHEI_PACKAGE 和 CUSTOM_SEGOE_PACKAGE 的绝对路径（去重）。
+    字体包缺失或不是 zip/7z 格式时抛出 RuntimeError。
     """
     source_dir = os.path.abspath(config.get("SOURCE_FILES_DIR", "./source_files"))
-    temp_dir = os.path.abspath(config.get("TEMP_DIR", "./temp"))
-    os.makedirs(temp_dir, exist_ok=True)
 
-    def extract_font_package(pkg_item):
+    packages = []
+    if config.get("ENABLE_MS_YAHEI", True):
+        ms_pkg = config.get("CUSTOM_MS_YAHEI_PACKAGE", "")
+        if not ms_pkg:
+            raise RuntimeError("未指定自定义中文字体包路径 (config.yaml)")
+        packages.extend(ms_pkg if isinstance(ms_pkg, list) else [ms_pkg])
+    if config.get("ENABLE_SEGOE_UI", True):
+        se_pkg = config.get("CUSTOM_SEGOE_PACKAGE", "")
+        if not se_pkg:
+            raise RuntimeError("未指定自定义英文字体包路径 (config.yaml)")
+        packages.extend(se_pkg if isinstance(se_pkg, list) else [se_pkg])
+
+    # 先检查全部字体包，避免解压到一半才发现缺失
+    pkg_paths = []
+    for pkg_item in packages:
         pkg_path = (
             pkg_item if os.path.isabs(pkg_item) else os.path.join(source_dir, pkg_item)
         )
         pkg_path = os.path.abspath(pkg_path)
         if not os.path.isfile(pkg_path):
             raise RuntimeError(f"自定义字体包不存在: {pkg_path}")
-        ext = os.path.splitext(pkg_path)[1].lower()
+        if os.path.splitext(pkg_path)[1].lower() not in (".zip", ".7z"):
+            raise RuntimeError(f"仅支持 zip/7z 格式，自定义字体包错误: {pkg_path}")
+        if pkg_path not in pkg_paths:
+            pkg_paths.append(pkg_path)
+    return pkg_paths
+
+
+def can_read_directly(sources):
+    """
+    映射表中的源字体是否都能直接从字体包读取使用：
+    只有 TTF 可以，OTF 需要先转换，TTC/OTC 中的字体（x.ttc#N）需要先拆分。
+    """
+    return all(
+        "#" not in src and os.path.splitext(src)[1].lower() == ".ttf" for src in sources
+    )
+
+
+def read_archive_members(archive_paths, targets):
+    """
+    不解压到磁盘，直接从一个或多个 zip/7z 字体包中读出文件名属于 targets 的成员。
+    返回 {文件名: 字节数据}；同名文件以先出现的为准，包中不存在的文件不会出现在结果中。
+    """
+    found = {}
+    for archive_path in archive_paths:
+        wanted = {os.path.basename(t) for t in targets} - set(found)
+        if not wanted:
+            break
+        found_before = len(found)
+        ext = os.path.splitext(archive_path)[1].lower()
         if ext == ".zip":
-            # 始终用zipfile并强制用gbk修正文件名，兼容所有中文zip
-            with zipfile.ZipFile(pkg_path, "r") as zf:
+            with zipfile.ZipFile(archive_path, "r") as zf:
                 for info in zf.infolist():
-                    name = info.filename
-                    try:
-                        name_gbk = name.encode("cp437").decode("gbk")
-                    except Exception:
-                        name_gbk = name
-                    target_path = os.path.join(temp_dir, name_gbk)
-                    if info.is_dir():
-                        os.makedirs(target_path, exist_ok=True)
-                    else:
-                        os.makedirs(os.path.dirname(target_path), exist_ok=True)
-                        with zf.open(info) as src, open(target_path, "wb") as dst:
-                            dst.write(src.read())
+                    name = os.path.basename(_zip_member_name(info).rstrip("/"))
+                    if not info.is_dir() and name in wanted and name not in found:
+                        found[name] = zf.read(info)
         elif ext == ".7z":
-            with sz.SevenZipFile(pkg_path, mode="r") as archive:
-                archive.extractall(path=temp_dir)
+            with sz.SevenZipFile(archive_path, mode="r") as archive:
+                infos = [
+                    info
+                    for info in archive.list()
+                    if not info.is_directory
+                    and os.path.basename(info.filename) in wanted
+                ]
+                if not infos:
+                    continue
+                # BytesIOFactory 会丢弃超过上限的数据，上限取最大成员的大小
+                factory = BytesIOFactory(max(info.uncompressed for info in infos) + 1)
+                archive.extract(
+                    targets=[info.filename for info in infos], factory=factory
+                )
+                for info in infos:
+                    name = os.path.basename(info.filename)
+                    if name not in found:
+                        member = factory.get(info.filename)
+                        member.seek(0)
+                        found[name] = member.read()
         else:
-            raise RuntimeError(f"仅支持 zip/7z 格式，自定义字体包错误: {pkg_path}")
+            raise RuntimeError(f"仅支持 zip/7z 格式，错误文件: {archive_path}")
+        logging.info(
+            f"{os.path.basename(archive_path)}: 直接读取 {len(found) - found_before} 个字体文件"
+        )
+    return found
 
-    if config.get("ENABLE_MS_YAHEI", True):
-        ms_pkg = config.get("CUSTOM_MS_YAHEI_PACKAGE", "")
-        if not ms_pkg:
-            raise RuntimeError("未指定自定义中文字体包路径 (config.yaml)")
-        if isinstance(ms_pkg, list):
-            for pkg in ms_pkg:
-                extract_font_package(pkg)
+
+def extract_custom_font_packages(config):
+    """
+    解压 config.yaml 中指定的 CUSTOM_MS_YAHEI_PACKAGE 和 CUSTOM_SEGOE_PACKAGE 到 TEMP_DIR。
+    仅支持 zip/7z 格式。各字体包并行解压，zip 包内的成员也并行、流式写入磁盘。
+    解压结果记录在 TEMP_DIR 下的解压清单中，字体包未变且解出的文件仍完好时不再重复解压。
+    """
+    from .file_ops import invalidate_font_index
+
+    temp_dir = os.path.abspath(config.get("TEMP_DIR", "./temp"))
+    os.makedirs(temp_dir, exist_ok=True)
+    invalidate_font_index(temp_dir)
+
+    pkg_paths = get_custom_package_paths(config)
+    if not pkg_paths:
+        return
+
+    # 清单中内容未变的字体包沿用记录的成员列表，其余字体包读取成员列表
+    manifest = _load_extract_manifest(temp_dir)
+    digests = {}
+    members = {}
+    for pkg_path in pkg_paths:
+        digests[pkg_path] = file_sha256(pkg_path)
+        entry = manifest.get(pkg_path)
+        if entry and entry.get("sha256") == digests[pkg_path]:
+            members[pkg_path] = list(entry.get("members", {}))
         else:
-            extract_font_package(ms_pkg)
-    if config.get("ENABLE_SEGOE_UI", True):
-        se_pkg = config.get("CUSTOM_SEGOE_PACKAGE", "")
-        if not se_pkg:
-            raise RuntimeError("未指定自定义英文字体包路径 (config.yaml)")
-        if isinstance(se_pkg, list):
-            for pkg in se_pkg:
-                extract_font_package(pkg)
+            members[pkg_path] = _list_package_members(pkg_path)
+
+    # 多个字体包中都有的文件（如 LICENSE.txt）按配置顺序由后面的字体包覆盖前面的，
+    # 与逐个解压时一致；这些文件不参与并行解压，也不参与完好性检查
+    owners = defaultdict(list)
+    for pkg_path in pkg_paths:
+        for key in {_member_key(name) for name in members[pkg_path]}:
+            owners[key].append(pkg_path)
+    shared = {key for key, pkgs in owners.items() if len(pkgs) > 1}
+
+    # 跳过已解压且内容完好的字体包（同一次运行中主流程与 Segoe UI 流程都会调用本函数）
+    pending = []
+    for pkg_path in pkg_paths:
+        entry = manifest.get(pkg_path)
+        if _is_already_extracted(entry, digests[pkg_path], temp_dir, shared):
+            logging.info(f"字体包已解压且内容完好，跳过: {os.path.basename(pkg_path)}")
         else:
-            extract_font_package(se_pkg)
+            # 解压过程中旧记录不再可信
+            manifest.pop(pkg_path, None)
+            pending.append(pkg_path)
+    if not pending:
+        return
+
+    max_workers = get_config_value(config, "MAX_PARALLEL_EXTRACT_WORKERS", None)
+    max_workers = max_workers or min(8, (os.cpu_count() or 1) + 2)
+
+    # 待解压字体包写到的共有文件，需要按配置顺序从全部拥有它的字体包（包括已跳过的）重新写出
+    rewrite = {key for key in shared if any(p in pending for p in owners[key])}
+    if rewrite:
+        logging.info(f"{len(rewrite)} 个文件在多个字体包中重复出现，将按配置顺序解压")
+
+    def select(pkg_path, keys, exclude):
+        return {
+            name for name in members[pkg_path] if (_member_key(name) in keys) != exclude
+        }
+
+    def extract_font_package(pkg_path, names):
+        if pkg_path.lower().endswith(".zip"):
+            return _extract_zip_streaming(pkg_path, temp_dir, member_pool, names)
+        return _extract_7z(pkg_path, temp_dir, names)
+
+    # 字体包与 zip 成员分别使用独立的线程池，字体包任务等待成员任务时不会互相阻塞
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as member_pool:
+            with ThreadPoolExecutor(
+                max_workers=min(max_workers, len(pending))
+            ) as package_pool:
+                futures = [
+                    package_pool.submit(
+                        extract_font_package, pkg_path, select(pkg_path, shared, True)
+                    )
+                    for pkg_path in pending
+                ]
+                for future in futures:
+                    future.result()
+            for pkg_path in pkg_paths:
+                names = select(pkg_path, rewrite, False)
+                if names:
+                    extract_font_package(pkg_path, names)
+        for pkg_path in pending:
+            logging.info(f"已解压自定义字体包: {os.path.basename(pkg_path)}")
+            manifest[pkg_path] = {
+                "sha256": digests[pkg_path],
+                "members": _describe_extracted_members(temp_dir, members[pkg_path]),
+            }
+    finally:
+        # 解压失败时也要保存清单，移除已失效的旧记录
+        _save_extract_manifest(temp_dir, manifest)
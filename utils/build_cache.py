@@ -0,0 +1,94 @@
+"""
+构建缓存模块
+按源字体哈希、相关配置与 font_info 条目为生成的字体文件建立内容寻址缓存
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+
+from .config import get_config_value
+from .file_ops import ensure_dir_exists, safe_copy
+
+# 生成逻辑变化导致旧缓存失效时递增
+CACHE_FORMAT_VERSION = 1
+
+# 同一进程内的文件哈希缓存，键为 (路径, 大小, 修改时间)
+_file_hash_memo = {}
+
+
+def is_cache_enabled(config):
+    """是否启用构建缓存"""
+    return bool(get_config_value(config, "ENABLE_BUILD_CACHE", False))
+
+
+def get_cache_dir(config):
+    """获取构建缓存目录"""
+    return os.path.normpath(get_config_value(config, "BUILD_CACHE_DIR", "./cache"))
+
+
+def hash_file(path, block_size=1024 * 1024):
+    """
+    计算文件的 SHA-256，同一进程内对未变化的文件只计算一次。
+    """
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    digest = _file_hash_memo.get(memo_key)
+    if digest is None:
+        sha256_hash = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(block_size), b""):
+                sha256_hash.update(block)
+        digest = sha256_hash.hexdigest()
+        _file_hash_memo[memo_key] = digest
+    return digest
+
+
+def make_cache_key(*parts):
+    """
+    由任意可 JSON 序列化的部分生成缓存键。
+    """
+    payload = json.dumps(
+        [CACHE_FORMAT_VERSION, *parts], sort_keys=True, ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _cache_path(config, key, suffix):
+    return os.path.join(get_cache_dir(config), key[:2], key + suffix)
+
+
+def restore_from_cache(config, key, dst_path):
+    """
+    若缓存中存在 key 对应的文件，则复制到 dst_path 并返回 True。
+    """
+    if not is_cache_enabled(config):
+        return False
+    cached = _cache_path(config, key, os.path.splitext(dst_path)[1])
+    if not os.path.isfile(cached):
+        return False
+    safe_copy(cached, dst_path)
+    logging.debug(f"命中构建缓存: {os.path.basename(dst_path)}")
+    return True
+
+
+def store_in_cache(config, key, src_path):
+    """
+    将 src_path 存入缓存，先写临时文件再原子替换，避免中断留下残缺文件。
+    """
+    if not is_cache_enabled(config):
+        return
+    cached = _cache_path(config, key, os.path.splitext(src_path)[1])
+    if os.path.isfile(cached):
+        return
+    ensure_dir_exists(os.path.dirname(cached))
+    tmp_path = cached + ".tmp"
+    try:
+        shutil.copyfile(src_path, tmp_path)
+        os.replace(tmp_path, cached)
+    except OSError as e:
+        logging.warning(f"写入构建缓存失败: {src_path}，原因: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
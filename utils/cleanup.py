@@ -7,6 +7,8 @@ import logging
 import os
 import shutil
 
+from .file_ops import invalidate_font_index
+
 
 def clean_temp_dir(config):
     """清理临时目录"""
@@ -20,4 +22,5 @@ def clean_temp_dir(config):
                 shutil.rmtree(file_path)
         except Exception as e:
             logging.warning(f"清理 temp 文件失败: {file_path}，原因: {e}")
+    invalidate_font_index(temp_dir)
     logging.info("已清理 temp 目录下所有文件。")
@@ -8,9 +8,18 @@ import os
 
 import yaml
 
+# 已加载的配置，同一进程内各模块共享
+_config = None
+
 
 def load_config():
-    """加载配置文件"""
+    """
+    加载配置文件。同一进程内只解析一次，各模块拿到的是同一个配置对象，
+    流程中对配置的修改（如 custom 模式下 OTF/字体集合转换后的映射表）对所有模块可见。
+    """
+    global _config
+    if _config is not None:
+        return _config
     config_path = os.path.join(
         os.path.dirname(os.path.dirname(__file__)), "config.yaml"
     )
@@ -20,7 +29,8 @@ def load_config():
         raise RuntimeError(
             f"config.yaml 解析异常，返回类型: {type(config)}, 内容: {config}"
         )
-    return config
+    _config = config
+    return _config
 
 
 def validate_config(config):
@@ -0,0 +1,65 @@
+"""
+文件摘要模块
+计算文件 SHA-256，并用旁路文件缓存结果，文件未变化时不再重复读取
+"""
+
+import hashlib
+import json
+import logging
+import os
+
+# 摘要缓存文件后缀，与被校验文件放在同一目录
+SIDECAR_SUFFIX = ".sha256"
+
+# 计算摘要时单次读取的块大小
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def _sidecar_path(path):
+    return path + SIDECAR_SUFFIX
+
+
+def read_cached_digest(path):
+    """
+    读取 path 的摘要缓存。
+    缓存不存在、损坏，或记录的文件大小、修改时间与当前文件不一致时返回 None。
+    """
+    try:
+        with open(_sidecar_path(path), encoding="utf-8") as f:
+            record = json.load(f)
+        stat = os.stat(path)
+    except (OSError, ValueError):
+        return None
+    if record.get("size") != stat.st_size or record.get("mtime_ns") != stat.st_mtime_ns:
+        return None
+    return record.get("sha256")
+
+
+def write_cached_digest(path, digest):
+    """按 path 当前的大小和修改时间写入摘要缓存"""
+    stat = os.stat(path)
+    record = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": digest}
+    try:
+        with open(_sidecar_path(path), "w", encoding="utf-8") as f:
+            json.dump(record, f)
+    except OSError as e:
+        logging.warning(f"写入摘要缓存失败: {path}，原因: {e}")
+
+
+def file_sha256(path, use_cache=True):
+    """
+    返回文件的 SHA-256（十六进制小写）。
+    use_cache 为 True 时优先使用摘要缓存，重新计算后会更新缓存。
+    """
+    if use_cache:
+        digest = read_cached_digest(path)
+        if digest:
+            return digest
+    sha256_hash = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            sha256_hash.update(block)
+    digest = sha256_hash.hexdigest()
+    if use_cache:
+        write_cached_digest(path, digest)
+    return digest
@@ -0,0 +1,215 @@
+"""
+下载模块
+提供共享连接池的 HTTP 下载，支持通过 Range 请求断点续传
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+
+import requests as req
+from requests.adapters import HTTPAdapter
+
+from .digest import HASH_BLOCK_SIZE, SIDECAR_SUFFIX, write_cached_digest
+from .file_ops import ensure_dir_exists
+from .progress import print_progress_bar
+
+# 单次读取的块大小，字体包动辄数百 MB，使用较大的块减少系统调用
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+# 连接池大小，需不小于并发下载数
+POOL_SIZE = 8
+
+# 未下载完成的数据所在文件的后缀，下次运行时从中断点续传
+PART_SUFFIX = ".part"
+# 记录 .part 文件对应的服务器文件版本（ETag 或 Last-Modified），续传时用于 If-Range
+PART_VALIDATOR_SUFFIX = ".part.json"
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """获取全局共享的 requests.Session（线程安全地延迟创建）"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = req.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+    return _session
+
+
+def list_downloaded_files(directory):
+    """列出目录中的文件名，忽略未下载完成的 .part 文件及其版本记录和 .sha256 摘要缓存"""
+    return [
+        name
+        for name in os.listdir(directory)
+        if not name.endswith((PART_SUFFIX, PART_VALIDATOR_SUFFIX, SIDECAR_SUFFIX))
+    ]
+
+
+def _get_validator(resp):
+    """
+    从响应头取出可用于 If-Range 的文件版本标识：优先强 ETag，其次 Last-Modified。
+    弱 ETag（W/ 开头）不能用于 If-Range，没有可用标识时返回 None。
+    """
+    etag = resp.headers.get("ETag")
+    if etag and not etag.startswith("W/"):
+        return etag
+    return resp.headers.get("Last-Modified")
+
+
+def _load_validator(validator_path):
+    try:
+        with open(validator_path, encoding="utf-8") as f:
+            return json.load(f).get("validator")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _save_validator(validator_path, validator):
+    if validator is None:
+        return
+    try:
+        with open(validator_path, "w", encoding="utf-8") as f:
+            json.dump({"validator": validator}, f)
+    except OSError as e:
+        logging.debug(f"无法记录断点续传信息: {e}")
+
+
+def _discard_part(part_path, validator_path):
+    """删除未完成的下载及其版本记录（不存在时忽略）"""
+    for path in (part_path, validator_path):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def _parse_content_range(value):
+    """
+    解析 Content-Range 头，"bytes 100-199/1000" 返回 (100, 1000)，
+    "bytes */1000" 返回 (None, 1000)；总长度未知或格式不符时对应项为 None。
+    """
+    match = re.match(r"bytes\s+(?:(\d+)-\d+|\*)/(\d+|\*)", value or "")
+    if not match:
+        return None, None
+    start, total = match.groups()
+    return (
+        int(start) if start is not None else None,
+        int(total) if total != "*" else None,
+    )
+
+
+def _finish_download(part_path, target_path, sha256_hash, validator_path):
+    os.replace(part_path, target_path)
+    if os.path.exists(validator_path):
+        os.remove(validator_path)
+    digest = sha256_hash.hexdigest()
+    write_cached_digest(target_path, digest)
+    return digest
+
+
+def download_file(url, target_path, timeout=None, show_progress=True):
+    """
+    下载 url 到 target_path。
+    数据先写入 target_path + ".part"，若该文件已存在则用 Range 请求从断点继续；
+    续传时带上 If-Range（首次下载时记录的 ETag 或 Last-Modified），服务器上的文件已变化时
+    服务器返回完整文件，不会把新文件接在旧数据之后。服务器不支持断点续传、
+    Content-Range 与断点不一致或没有版本记录时从头下载。下载完成后原子重命名为 target_path。
+    SHA-256 在写入过程中同步计算并写入摘要缓存，校验时无需再次读取文件。
+    :param timeout: 连接与读取超时（秒）
+    :param show_progress: 是否显示进度条（并发下载时应关闭）
+    :return: 下载文件的 SHA-256（十六进制小写）
+    """
+    ensure_dir_exists(os.path.dirname(target_path) or ".")
+    part_path = target_path + PART_SUFFIX
+    validator_path = target_path + PART_VALIDATOR_SUFFIX
+    resume_from = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    validator = _load_validator(validator_path) if resume_from else None
+    if resume_from and validator is None:
+        # 无法确认已下载的部分与服务器上的文件是同一版本，从头下载
+        logging.info(f"缺少断点续传信息，重新下载: {os.path.basename(target_path)}")
+        _discard_part(part_path, validator_path)
+        resume_from = 0
+    headers = (
+        {"Range": f"bytes={resume_from}-", "If-Range": validator} if resume_from else {}
+    )
+
+    session = get_session()
+    with session.get(url, headers=headers, stream=True, timeout=timeout) as resp:
+        if resp.status_code == 416 and resume_from:
+            _, total = _parse_content_range(resp.headers.get("Content-Range"))
+            if total == resume_from:
+                # .part 已是完整文件（上次在重命名前中断），直接完成
+                logging.info(f"已下载完整，无需续传: {os.path.basename(target_path)}")
+                sha256_hash = hashlib.sha256()
+                with open(part_path, "rb") as f:
+                    for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+                        sha256_hash.update(block)
+                return _finish_download(
+                    part_path, target_path, sha256_hash, validator_path
+                )
+            # 断点超出文件范围（服务器上的文件已变化），从头下载
+            logging.warning(
+                f"断点续传位置无效，重新下载: {os.path.basename(target_path)}"
+            )
+            _discard_part(part_path, validator_path)
+            return download_file(url, target_path, timeout, show_progress)
+        resp.raise_for_status()
+
+        sha256_hash = hashlib.sha256()
+        if resp.status_code == 206:
+            start, _ = _parse_content_range(resp.headers.get("Content-Range"))
+            if start != resume_from:
+                logging.warning(
+                    f"服务器返回的数据范围与断点不一致，重新下载: {os.path.basename(target_path)}"
+                )
+                _discard_part(part_path, validator_path)
+                resp.close()
+                return download_file(url, target_path, timeout, show_progress)
+            mode = "ab"
+            logging.info(
+                f"从 {resume_from} 字节处继续下载: {os.path.basename(target_path)}"
+            )
+            # 续传时先把已下载的部分计入摘要
+            with open(part_path, "rb") as f:
+                for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+                    sha256_hash.update(block)
+        else:
+            mode = "wb"
+            resume_from = 0
+            # 记录文件版本，中断后续传时用于 If-Range
+            _discard_part(part_path, validator_path)
+            _save_validator(validator_path, _get_validator(resp))
+        content_length = int(resp.headers.get("content-length", 0))
+        total_size = resume_from + content_length if content_length else 0
+        downloaded_size = resume_from
+
+        with open(part_path, mode) as f:
+            for chunk in resp.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                if chunk:
+                    f.write(chunk)
+                    sha256_hash.update(chunk)
+                    downloaded_size += len(chunk)
+                    if show_progress:
+                        print_progress_bar(
+                            downloaded_size,
+                            total_size,
+                            prefix="下载进度",
+                            suffix=f"{downloaded_size}/{total_size} 字节",
+                            length=30,
+                        )
+        if show_progress:
+            print()  # 进度条完成后换行
+
+    if total_size and downloaded_size != total_size:
+        # 保留 .part 文件，下次运行时续传
+        raise RuntimeError(
+            f"下载不完整: {os.path.basename(target_path)} ({downloaded_size}/{total_size} 字节)"
+        )
+    return _finish_download(part_path, target_path, sha256_hash, validator_path)
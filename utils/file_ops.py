@@ -3,8 +3,16 @@
 负责文件系统相关的操作，如目录创建、文件复制、查找等
 """
 
+import logging
 import os
 import shutil
+import sys
+
+# Linux 下 FICLONE ioctl 的请求号（_IOW(0x94, 9, int)），用于 reflink
+FICLONE = 0x40049409
+
+# 文件名索引缓存：{根目录绝对路径: {文件名: [相对路径, ...]}}
+_font_index_cache = {}
 
 
 def ensure_dir_exists(path):
@@ -38,12 +46,120 @@ def safe_copy(src, dst, overwrite=True):
         if os.path.isdir(dst):
             raise IsADirectoryError(f"目标是目录: {dst}")
     ensure_dir_exists(os.path.dirname(dst))
+    # 先写临时文件再替换：dst 若与已发布的结果文件是硬链接，不会被原地改写
+    tmp_path = dst + ".tmp"
+    try:
+        shutil.copy2(src, tmp_path)
+        os.replace(tmp_path, dst)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _reflink(src, dst):
+    """
+    在支持的文件系统（Btrfs、XFS 等）上创建与 src 共享数据块的写时复制副本。
+    不支持时抛出 OSError，且不会留下 dst。
+    """
+    if not sys.platform.startswith("linux"):
+        raise OSError("仅 Linux 支持 reflink")
+    import fcntl
+
+    try:
+        with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+        shutil.copystat(src, dst)
+    except BaseException:
+        if os.path.exists(dst):
+            os.remove(dst)
+        raise
+
+
+def publish_file(src, dst, allow_move=False):
+    """
+    把生成的文件发布到 dst（已存在时替换），不复制数据的方式优先：
+    依次尝试硬链接、reflink，allow_move 为 True 时再尝试直接移动 src，都不可用时才复制。
+    前三种方式的耗时与文件大小无关。返回实际使用的方式："link"、"reflink"、"move" 或 "copy"。
+    """
+    if not os.path.isfile(src):
+        raise FileNotFoundError(f"源文件不存在: {src}")
+    if os.path.isdir(dst):
+        raise IsADirectoryError(f"目标是目录: {dst}")
+    ensure_dir_exists(os.path.dirname(dst))
+    if os.path.lexists(dst):
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+        return "link"
+    except OSError:
+        pass
+    try:
+        _reflink(src, dst)
+        return "reflink"
+    except OSError:
+        pass
+    if allow_move:
+        try:
+            os.replace(src, dst)
+            return "move"
+        except OSError:
+            pass
     shutil.copy2(src, dst)
+    return "copy"
+
+
+def build_font_index(root_dir):
+    """
+    用 os.scandir 一次遍历 root_dir，建立 文件名 -> [相对路径, ...] 的索引。
+    """
+    root_dir = os.path.abspath(root_dir)
+    index = {}
+    stack = [root_dir]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file():
+                        index.setdefault(entry.name, []).append(
+                            os.path.relpath(entry.path, root_dir)
+                        )
+        except FileNotFoundError:
+            continue
+    for paths in index.values():
+        paths.sort()
+    return index
+
+
+def get_font_index(root_dir, refresh=False):
+    """
+    获取 root_dir 的文件名索引，首次调用或 refresh 为 True 时重新建立。
+    """
+    key = os.path.abspath(root_dir)
+    if refresh or key not in _font_index_cache:
+        _font_index_cache[key] = build_font_index(key)
+    return _font_index_cache[key]
+
+
+def invalidate_font_index(root_dir=None):
+    """
+    使文件名索引失效（解压新的字体包或清理目录后调用）。
+    root_dir 为 None 时清空全部索引。
+    """
+    if root_dir is None:
+        _font_index_cache.clear()
+    else:
+        _font_index_cache.pop(os.path.abspath(root_dir), None)
 
 
 def find_font_file(root_dir, target_name):
     """
     在 root_dir 下递归查找名为 target_name 的文件，返回相对路径（相对于 root_dir）。
+    查找基于一次性建立的文件名索引；索引中没有时会重新扫描一次目录。
+    存在多个同名文件时记录警告并返回路径排序后的第一个。
     若未找到则抛出 FileNotFoundError。
     """
     # 防御性：只允许普通文件名，防止特殊字符
@@ -51,9 +167,14 @@ def find_font_file(root_dir, target_name):
         c in target_name for c in r"/\\:*?\"<>|"
     ):
         raise ValueError(f"非法文件名: {target_name}")
-    for dirpath, _, filenames in os.walk(root_dir):
-        for fname in filenames:
-            if fname == target_name:
-                rel_path = os.path.relpath(os.path.join(dirpath, fname), root_dir)
-                return rel_path
-    raise FileNotFoundError(f"未在 {root_dir} 下找到目标文件: {target_name}")
+    paths = get_font_index(root_dir).get(target_name)
+    if not paths:
+        # 索引建立后目录可能新增了文件（如 OTF 转换生成的 TTF）
+        paths = get_font_index(root_dir, refresh=True).get(target_name)
+    if not paths:
+        raise FileNotFoundError(f"未在 {root_dir} 下找到目标文件: {target_name}")
+    if len(paths) > 1:
+        logging.warning(
+            f"在 {root_dir} 下找到多个 {target_name}，使用 {paths[0]}，其余: {paths[1:]}"
+        )
+    return paths[0]
@@ -7,39 +7,187 @@ import logging
 import multiprocessing as mp
 import os
 import time
-from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 
-from otf2ttf.official.otf2ttf import MAX_ERR, TTFont
+from otf2ttf.official.otf2ttf import MAX_ERR, POST_FORMAT, REVERSE_DIRECTION, TTFont
+from otf2ttf.official.otf2ttf import TTCollection
+from otf2ttf.official.otf2ttf import collection_face_output, collection_to_ttf
+from otf2ttf.official.otf2ttf import family_otf_to_ttf
 from otf2ttf.official.otf2ttf import otf_to_ttf as official_otf2ttf
-from otf2ttf.official.otf2ttf import update_hmtx
+from otf2ttf.official.otf2ttf import sharded_glyphs_to_quadratic
 
+from .build_cache import hash_file, make_cache_key, restore_from_cache, store_in_cache
 from .config import get_config_value
+from .parallel import run_in_order
+from .profiling import profile_call
+from .timing import get_worker_peak_rss, record_task
+
+# 字体集合文件扩展名，映射中用 "文件名#序号" 引用其中的单个字体
+FONT_COLLECTION_EXTENSIONS = (".otc", ".ttc")
+
+
+def is_cff_collection(path):
+    """判断文件是否为 CFF 轮廓的字体集合（OTC，或扩展名为 .ttc 的 OTC）"""
+    if not path.lower().endswith(FONT_COLLECTION_EXTENSIONS):
+        return False
+    try:
+        collection = TTCollection(path, lazy=True)
+    except Exception:
+        return False
+    try:
+        return bool(collection.fonts) and collection.fonts[0].sfntVersion == "OTTO"
+    finally:
+        collection.close()
 
 
 def find_otf_files(root_dir):
     """
-    递归查找 root_dir 下所有 .otf 文件，返回绝对路径列表。
+    递归查找 root_dir 下所有 .otf 文件及 CFF 轮廓的字体集合，返回绝对路径列表。
     """
     otf_files = []
     for dirpath, _, filenames in os.walk(root_dir):
         for filename in filenames:
-            if filename.lower().endswith(".otf"):
-                otf_files.append(os.path.join(dirpath, filename))
+            path = os.path.join(dirpath, filename)
+            if filename.lower().endswith(".otf") or is_cff_collection(path):
+                otf_files.append(path)
     return otf_files
 
 
+def split_face_reference(src):
+    """
+    拆分映射中的集合字体引用 "xxx.otc#2"，返回 (集合文件, 序号)；不是集合引用时返回 None。
+    """
+    path, sep, index = src.rpartition("#")
+    if sep and index.isdigit() and path.lower().endswith(FONT_COLLECTION_EXTENSIONS):
+        return path, int(index)
+    return None
+
+
+def get_collection_face_cache_key(collection_path, font_number):
+    """按集合文件内容哈希、字体序号与转换参数生成单个字体转换结果的缓存键"""
+    return make_cache_key(
+        "otc2ttf",
+        hash_file(collection_path),
+        font_number,
+        MAX_ERR,
+        POST_FORMAT,
+        REVERSE_DIRECTION,
+    )
+
+
+def convert_font_collection(
+    collection_path,
+    font_numbers=None,
+    verbose=True,
+    use_parallel=True,
+    max_workers=None,
+):
+    """
+    将字体集合中的字体转为独立的 TTF（<文件名>_<序号>.ttf，与集合位于同一目录）。
+    共用同一 CFF 表的字体（如思源黑体 OTC 的各语言版本）在同一进程中只解析、转换一次，
+    不同的 CFF 分发到进程池并行转换。
+    font_numbers: 要转换的字体序号，为 None 时转换全部
+    返回生成的 TTF 路径列表。
+    """
+    start = time.time()
+    collection = TTCollection(collection_path, lazy=True)
+    num_fonts = len(collection.fonts)
+    collection.close()
+    outputs = {i: collection_face_output(collection_path, i) for i in range(num_fonts)}
+    if font_numbers is not None:
+        invalid = [i for i in font_numbers if not 0 <= i < num_fonts]
+        if invalid:
+            raise ValueError(
+                f"{os.path.basename(collection_path)} 只包含 {num_fonts} 个字体，"
+                f"序号无效: {invalid}"
+            )
+    if verbose:
+        count = num_fonts if font_numbers is None else len(set(font_numbers))
+        logging.info(
+            f"[OTF2TTF] 开始转换字体集合: {os.path.basename(collection_path)}"
+            f"（{count}/{num_fonts} 个字体）"
+        )
+    ttf_files = collection_to_ttf(
+        collection_path,
+        outputs,
+        fontNumbers=font_numbers,
+        workers=max_workers if use_parallel else 1,
+        max_err=MAX_ERR,
+        task_runner=profile_call,
+    )
+    if verbose:
+        logging.info(
+            f"[OTF2TTF] 字体集合转换完成: {os.path.basename(collection_path)}，"
+            f"用时 {time.time() - start:.2f} 秒"
+        )
+    return ttf_files
+
+
+def get_conversion_cache_key(otf_path, engine="face", family_paths=None):
+    """
+    按 OTF 内容哈希、转换参数与转换方式生成转换结果的缓存键。
+    family_paths: family 方式下与 otf_path 一起转换的同组 OTF（含自身），
+    任一字重变化都会影响整组的转换结果，因此键中包含全组的内容哈希
+    """
+    family_hashes = sorted(hash_file(path) for path in family_paths or [])
+    return make_cache_key(
+        "otf2ttf",
+        hash_file(otf_path),
+        family_hashes,
+        MAX_ERR,
+        POST_FORMAT,
+        REVERSE_DIRECTION,
+        engine,
+    )
+
+
+# 估算单个转换任务的峰值内存：完全解析后的 TTFont 与 cu2qu 中间结果
+# 约为 OTF 文件大小的数十倍，另加子进程自身的基础占用
+CONVERSION_MEMORY_FACTOR = 100
+WORKER_BASE_MEMORY = 64 * 1024 * 1024
+
+# 未配置内存预算时，默认使用物理内存的这一比例
+DEFAULT_MEMORY_BUDGET_RATIO = 0.6
+
+
+def get_total_memory():
+    """获取物理内存总量（字节），无法获取时返回 None"""
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def get_memory_budget(config):
+    """
+    获取 OTF 转换的内存预算（字节）。
+    未开启 ENABLE_MEMORY_OPTIMIZATION 或无法确定预算时返回 None（不限制）。
+    """
+    if not get_config_value(config, "ENABLE_MEMORY_OPTIMIZATION", True):
+        return None
+    budget_mb = get_config_value(config, "MEMORY_BUDGET_MB", None)
+    if budget_mb:
+        return int(budget_mb) * 1024 * 1024
+    total = get_total_memory()
+    return int(total * DEFAULT_MEMORY_BUDGET_RATIO) if total else None
+
+
+def estimate_conversion_memory(otf_path):
+    """按文件大小估算转换单个 OTF 的峰值内存（字节）"""
+    size = os.path.getsize(otf_path) if os.path.exists(otf_path) else 0
+    return WORKER_BASE_MEMORY + size * CONVERSION_MEMORY_FACTOR
+
+
 def _convert_otf_to_ttf_worker(otf_path):
     """
     在子进程中运行的OTF转TTF转换函数。
-    返回 (otf_path, success: bool, duration: float, error_msg: str)
+    返回 (otf_path, success: bool, duration: float, error_msg: str, peak_rss: int|None)
     """
     start = time.time()
     try:
         # 直接调用官方FontTools的otf2ttf实现
         font = TTFont(otf_path)
         official_otf2ttf(font, max_err=MAX_ERR)
-        # 更新hmtx表
-        update_hmtx(font, font["glyf"])
         ttf_path = os.path.splitext(otf_path)[0] + ".ttf"
         font.save(ttf_path)
 
@@ -54,12 +202,19 @@ def _convert_otf_to_ttf_worker(otf_path):
     end = time.time()
 
     # 只返回必要的信息，减少数据传输
-    return (os.path.basename(otf_path), success, end - start, error_msg)
+    return (
+        os.path.basename(otf_path),
+        success,
+        end - start,
+        error_msg,
+        get_worker_peak_rss(),
+    )
 
 
-def convert_otf_to_ttf(otf_path, verbose=False):
+def convert_otf_to_ttf(otf_path, verbose=False, shard_workers=None):
     """
     使用官方实现将单个 OTF 文件转为 TTF。
+    shard_workers: 大于 1 时把字形分片交给多个进程转换曲线，适用于单个超大字体
     返回 (success: bool, duration: float)
     """
     start = time.time()
@@ -67,10 +222,16 @@ def convert_otf_to_ttf(otf_path, verbose=False):
         # 直接调用官方FontTools的otf2ttf实现
         if verbose:
             logging.info(f"[OTF2TTF] 开始转换: {os.path.basename(otf_path)}")
+        quad_glyphs = None
+        if shard_workers and shard_workers > 1:
+            quad_glyphs = sharded_glyphs_to_quadratic(
+                otf_path,
+                workers=shard_workers,
+                max_err=MAX_ERR,
+                task_runner=profile_call,
+            )
         font = TTFont(otf_path)
-        official_otf2ttf(font, max_err=MAX_ERR)
-        # 更新hmtx表
-        update_hmtx(font, font["glyf"])
+        official_otf2ttf(font, quadGlyphs=quad_glyphs, max_err=MAX_ERR)
         ttf_path = os.path.splitext(otf_path)[0] + ".ttf"
         font.save(ttf_path)
         if verbose:
@@ -84,6 +245,78 @@ def convert_otf_to_ttf(otf_path, verbose=False):
     return success, end - start
 
 
+def get_family_key(otf_path):
+    """
+    根据文件名推断字体家族，如 SourceHanSerifCN-Bold.otf -> SourceHanSerifCN。
+    """
+    stem = os.path.splitext(os.path.basename(otf_path))[0]
+    return stem.rsplit("-", 1)[0] if "-" in stem else stem
+
+
+def _convert_otf_family_worker(otf_paths):
+    """
+    在子进程中运行的同族OTF转TTF函数，同族各字重的曲线一起转换。
+    返回 [(otf_path, success: bool, duration: float, error_msg: str, peak_rss: int|None)]
+    """
+    start = time.time()
+    try:
+        fonts = [TTFont(otf_path) for otf_path in otf_paths]
+        family_otf_to_ttf(fonts, max_err=MAX_ERR)
+        for otf_path, font in zip(otf_paths, fonts):
+            font.save(os.path.splitext(otf_path)[0] + ".ttf")
+        del fonts
+        success, error_msg = True, ""
+    except Exception as e:
+        success, error_msg = False, str(e)
+    duration = time.time() - start
+    peak_rss = get_worker_peak_rss()
+    return [
+        (otf_path, success, duration, error_msg, peak_rss) for otf_path in otf_paths
+    ]
+
+
+def _batch_convert_otf_to_ttf_family(
+    otf_files, verbose=True, use_parallel=True, max_workers=None
+):
+    """
+    按字体家族分组批量转换 OTF 文件为 TTF，各组之间可并行。
+    """
+    families = {}
+    for otf_file in otf_files:
+        families.setdefault(get_family_key(otf_file), []).append(otf_file)
+    if verbose:
+        logging.info(f"按字体家族分组转换: 共 {len(families)} 组")
+
+    ttf_files = []
+    global_start = time.time()
+    tasks = [(sorted(paths),) for paths in families.values()]
+    for results in run_in_order(
+        _convert_otf_family_worker, tasks, use_parallel, max_workers
+    ):
+        for otf_path, success, duration, error_msg, peak_rss in results:
+            record_task(
+                os.path.basename(otf_path),
+                duration,
+                success=success,
+                peak_rss_bytes=peak_rss,
+            )
+            ttf_path = os.path.splitext(otf_path)[0] + ".ttf"
+            if success and os.path.exists(ttf_path):
+                ttf_files.append(ttf_path)
+                if verbose:
+                    logging.info(
+                        f"✓ 成功: {os.path.basename(ttf_path)} (所在组用时 {duration:.2f} 秒)"
+                    )
+            elif verbose:
+                logging.error(f"✗ 转换失败: {os.path.basename(otf_path)} - {error_msg}")
+    if verbose:
+        logging.info(
+            f"分组转换完成: 成功 {len(ttf_files)}/{len(otf_files)} 个文件，"
+            f"总用时 {time.time() - global_start:.2f} 秒"
+        )
+    return ttf_files
+
+
 def _classify_font_files_by_mapping(otf_files, msyh_mapping=None, segoe_mapping=None):
     """
     根据映射配置将字体文件分类为中文字体和英文字体。
@@ -118,9 +351,10 @@ def _classify_font_files_by_mapping(otf_files, msyh_mapping=None, segoe_mapping=
     return chinese_fonts, english_fonts
 
 
-def _batch_convert_otf_to_ttf_serial(otf_files, verbose=True):
+def _batch_convert_otf_to_ttf_serial(otf_files, verbose=True, shard_workers=None):
     """
     串行批量转换 OTF 文件为 TTF。
+    shard_workers 大于 1 时逐个文件转换，每个文件内部按字形分片并行。
     """
     ttf_files = []
     global_start = time.time()
@@ -129,7 +363,10 @@ def _batch_convert_otf_to_ttf_serial(otf_files, verbose=True):
             logging.info(
                 f"[{idx}/{len(otf_files)}] 正在转换: {os.path.basename(otf_file)}"
             )
-        success, duration = convert_otf_to_ttf(otf_file, verbose=verbose)
+        success, duration = convert_otf_to_ttf(
+            otf_file, verbose=verbose, shard_workers=shard_workers
+        )
+        record_task(os.path.basename(otf_file), duration, success=success)
         ttf_path = os.path.splitext(otf_file)[0] + ".ttf"
         if success and os.path.exists(ttf_path):
             ttf_files.append(ttf_path)
@@ -145,105 +382,119 @@ def _batch_convert_otf_to_ttf_serial(otf_files, verbose=True):
 
 
 def _batch_convert_otf_to_ttf_parallel(
-    otf_files, verbose=True, max_workers=None, msyh_mapping=None, segoe_mapping=None
+    otf_files,
+    verbose=True,
+    max_workers=None,
+    msyh_mapping=None,
+    segoe_mapping=None,
+    memory_budget=None,
+    recycle_workers=False,
 ):
     """
-    并行批量转换 OTF 文件为 TTF，支持任务分组和内存优化。
+    并行批量转换 OTF 文件为 TTF。
+    所有文件共用一个进程池，按文件大小从大到小提交：空闲进程随时领取下一个任务，
+    耗时最长的字体最先开始，避免最后只剩一个大字体在转换而其余进程空闲。
+    memory_budget: 内存预算（字节），同时运行的任务预计峰值内存之和不超过该值
+    recycle_workers: 每个子进程只处理一个任务，结束后退出以释放内存
     """
     if max_workers is None:
         max_workers = min(mp.cpu_count(), len(otf_files))
-
-    # 分类字体文件
-    chinese_fonts, english_fonts = _classify_font_files_by_mapping(
-        otf_files, msyh_mapping, segoe_mapping
-    )
+    max_workers = max(1, min(max_workers, len(otf_files)))
 
     if verbose:
+        # 分类仅用于日志，调度只看文件大小
+        chinese_fonts, english_fonts = _classify_font_files_by_mapping(
+            otf_files, msyh_mapping, segoe_mapping
+        )
         logging.info(
             f"字体分类: 中文字体 {len(chinese_fonts)} 个，英文字体 {len(english_fonts)} 个"
         )
 
+    # 文件大小与字形数大致成正比，用它估计转换耗时
+    ordered_files = sorted(
+        otf_files,
+        key=lambda path: os.path.getsize(path) if os.path.exists(path) else 0,
+        reverse=True,
+    )
+
     ttf_files = []
     global_start = time.time()
     completed_count = 0
     failed_count = 0
 
-    # 分组处理：先处理英文字体（通常更快），再处理中文字体
-    font_groups = []
-    if english_fonts:
-        font_groups.append(("英文字体", english_fonts))
-    if chinese_fonts:
-        font_groups.append(("中文字体", chinese_fonts))
-
-    for group_name, group_files in font_groups:
-        if verbose:
-            logging.info(f"开始处理{group_name}组 ({len(group_files)} 个文件)")
-
-        group_start = time.time()
-
-        # 为每个组分配工作进程数，中文字体组使用更多进程
-        if "中文" in group_name:
-            group_workers = min(max_workers, len(group_files))
-        else:
-            # 英文字体组使用较少进程，避免过度并行
-            group_workers = min(max_workers // 2, len(group_files))
-
-        if verbose:
-            logging.info(f"{group_name}组使用 {group_workers} 个工作进程")
-
-        # 使用进程池执行并行转换
-        with ProcessPoolExecutor(max_workers=group_workers) as executor:
-            # 提交当前组的所有任务
-            future_to_otf = {
-                executor.submit(_convert_otf_to_ttf_worker, otf_file): otf_file
-                for otf_file in group_files
-            }
+    estimates = {path: estimate_conversion_memory(path) for path in ordered_files}
+    if memory_budget and verbose:
+        logging.info(
+            f"内存预算 {memory_budget / 1024 ** 3:.1f} GB，"
+            f"预计峰值合计 {sum(estimates.values()) / 1024 ** 3:.1f} GB"
+        )
 
-            # 处理完成的任务
-            for future in as_completed(future_to_otf):
-                otf_file = future_to_otf[future]
+    # 回收子进程可把转换大字体占用的内存还给系统
+    pool_kwargs = {"max_tasks_per_child": 1} if recycle_workers else {}
+    pending = list(ordered_files)
+    running = {}
+    projected = 0
+    with ProcessPoolExecutor(max_workers=max_workers, **pool_kwargs) as executor:
+        while pending or running:
+            # 准入控制：预计内存不超预算时才提交下一个任务；没有任务在运行时
+            # 总会提交一个，单个任务超出预算也不会卡住
+            while pending and len(running) < max_workers:
+                # 最大的任务放不下时，找一个放得下的较小任务填补空闲进程
+                candidate = None
+                for path in pending:
+                    if (
+                        not running
+                        or not memory_budget
+                        or projected + estimates[path] <= memory_budget
+                    ):
+                        candidate = path
+                        break
+                if candidate is None:
+                    break
+                pending.remove(candidate)
+                projected += estimates[candidate]
+                future = executor.submit(
+                    profile_call, _convert_otf_to_ttf_worker, candidate
+                )
+                running[future] = candidate
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                otf_file = running.pop(future)
+                projected -= estimates[otf_file]
+                completed_count += 1
                 try:
-                    filename, success, duration, error_msg = future.result()
-                    completed_count += 1
-
-                    if verbose:
-                        logging.info(
-                            f"[{completed_count}/{len(otf_files)}] 转换完成: {filename} (用时 {duration:.2f} 秒)"
-                        )
-
-                    if success:
-                        ttf_path = os.path.splitext(otf_file)[0] + ".ttf"
-                        if os.path.exists(ttf_path):
-                            ttf_files.append(ttf_path)
-                            if verbose:
-                                logging.info(f"✓ 成功: {os.path.basename(ttf_path)}")
-                        else:
-                            if verbose:
-                                logging.error(
-                                    f"✗ 文件未生成: {os.path.basename(ttf_path)}"
-                                )
-                            failed_count += 1
-                    else:
-                        if verbose:
-                            logging.error(f"✗ 转换失败: {filename} - {error_msg}")
-                        failed_count += 1
-
+                    filename, success, duration, error_msg, peak_rss = future.result()
+                    record_task(
+                        filename, duration, success=success, peak_rss_bytes=peak_rss
+                    )
                 except Exception as e:
-                    completed_count += 1
                     failed_count += 1
                     if verbose:
                         logging.error(
                             f"✗ 处理异常: {os.path.basename(otf_file)} - {str(e)}"
                         )
+                    continue
 
-                # 清理已完成的任务引用，释放内存
-                del future_to_otf[future]
+                if verbose:
+                    logging.info(
+                        f"[{completed_count}/{len(otf_files)}] 转换完成: {filename} (用时 {duration:.2f} 秒)"
+                    )
 
-        group_end = time.time()
-        if verbose:
-            logging.info(
-                f"{group_name}组处理完成，用时 {group_end - group_start:.2f} 秒"
-            )
+                if success:
+                    ttf_path = os.path.splitext(otf_file)[0] + ".ttf"
+                    if os.path.exists(ttf_path):
+                        ttf_files.append(ttf_path)
+                        if verbose:
+                            logging.info(f"✓ 成功: {os.path.basename(ttf_path)}")
+                    else:
+                        if verbose:
+                            logging.error(f"✗ 文件未生成: {os.path.basename(ttf_path)}")
+                        failed_count += 1
+                else:
+                    if verbose:
+                        logging.error(f"✗ 转换失败: {filename} - {error_msg}")
+                    failed_count += 1
 
     global_end = time.time()
     if verbose:
@@ -264,6 +515,10 @@ def batch_convert_otf_to_ttf(
     max_workers=None,
     msyh_mapping=None,
     segoe_mapping=None,
+    engine="face",
+    glyph_shard_workers=None,
+    memory_budget=None,
+    recycle_workers=False,
 ):
     """
     批量转换 OTF 文件为 TTF，支持并行处理。
@@ -274,13 +529,56 @@ def batch_convert_otf_to_ttf(
     max_workers: 最大工作进程数，为 None 时使用 CPU 核心数
     msyh_mapping: 微软雅黑映射，用于字体分类
     segoe_mapping: Segoe UI映射，用于字体分类
+    engine: 转换方式，face 为逐个字体转换，family 为同族字重一起转换（保持点兼容）
+    glyph_shard_workers: 大于 1 时按字形分片并行转换单个字体（仅 face 方式）
+    memory_budget: 并行转换的内存预算（字节），为 None 时不限制
+    recycle_workers: 是否每个任务结束后回收子进程
     返回转换成功的 TTF 文件路径列表。
     """
     if target_files is None:
         otf_files = find_otf_files(root_dir)
     else:
         # 只转换指定的文件
-        otf_files = [f for f in target_files if f.lower().endswith(".otf")]
+        otf_files = [
+            f
+            for f in target_files
+            if f.lower().endswith(".otf") or is_cff_collection(f)
+        ]
+
+    collections = [f for f in otf_files if not f.lower().endswith(".otf")]
+    if collections:
+        # 字体集合按集合内的 CFF 分组并行，其余 OTF 照常转换
+        ttf_files = []
+        for collection_path in collections:
+            try:
+                ttf_files.extend(
+                    convert_font_collection(
+                        collection_path,
+                        verbose=verbose,
+                        use_parallel=use_parallel,
+                        max_workers=max_workers,
+                    )
+                )
+            except Exception as e:
+                logging.error(
+                    f"✗ 字体集合转换失败: {os.path.basename(collection_path)} - {e}"
+                )
+        remaining = [f for f in otf_files if f.lower().endswith(".otf")]
+        if not remaining:
+            return ttf_files
+        return ttf_files + batch_convert_otf_to_ttf(
+            root_dir,
+            verbose=verbose,
+            target_files=remaining,
+            use_parallel=use_parallel,
+            max_workers=max_workers,
+            msyh_mapping=msyh_mapping,
+            segoe_mapping=segoe_mapping,
+            engine=engine,
+            glyph_shard_workers=glyph_shard_workers,
+            memory_budget=memory_budget,
+            recycle_workers=recycle_workers,
+        )
 
     total = len(otf_files)
     if total == 0:
@@ -291,6 +589,19 @@ def batch_convert_otf_to_ttf(
     if verbose:
         logging.info(f"共找到 {total} 个 OTF 文件，开始转换...")
 
+    if engine == "family":
+        return _batch_convert_otf_to_ttf_family(
+            otf_files, verbose, use_parallel, max_workers
+        )
+
+    if glyph_shard_workers and glyph_shard_workers > 1:
+        # 进程池中不能再嵌套进程池，字形分片时文件之间改为串行
+        if verbose:
+            logging.info(f"按字形分片并行转换，工作进程数: {glyph_shard_workers}")
+        return _batch_convert_otf_to_ttf_serial(
+            otf_files, verbose, shard_workers=glyph_shard_workers
+        )
+
     # 决定是否使用并行处理
     if use_parallel and total > 1:
         # 使用并行处理
@@ -301,7 +612,13 @@ def batch_convert_otf_to_ttf(
             logging.info(f"使用并行处理，工作进程数: {max_workers}")
 
         return _batch_convert_otf_to_ttf_parallel(
-            otf_files, verbose, max_workers, msyh_mapping, segoe_mapping
+            otf_files,
+            verbose,
+            max_workers,
+            msyh_mapping,
+            segoe_mapping,
+            memory_budget=memory_budget,
+            recycle_workers=recycle_workers,
         )
     else:
         # 使用串行处理
@@ -310,11 +627,55 @@ def batch_convert_otf_to_ttf(
         return _batch_convert_otf_to_ttf_serial(otf_files, verbose)
 
 
+def _convert_mapped_collection_faces(face_refs, temp_dir, verbose=True, config=None):
+    """
+    转换映射中引用到的集合字体，face_refs 为 {集合相对路径: {字体序号}}。
+    已在构建缓存中的字体直接恢复，每个集合只转换缺失的字体。
+    """
+    use_parallel = True
+    max_workers = None
+    if config:
+        use_parallel = get_config_value(config, "ENABLE_PARALLEL_OTF_CONVERSION", True)
+        max_workers = get_config_value(config, "MAX_PARALLEL_WORKERS", None)
+    use_cache = bool(config) and get_config_value(config, "ENABLE_BUILD_CACHE", False)
+
+    for src, font_numbers in sorted(face_refs.items()):
+        collection_path = os.path.join(temp_dir, src)
+        if not os.path.exists(collection_path):
+            raise FileNotFoundError(f"未找到字体集合: {collection_path}")
+        cache_keys = {}
+        for font_number in sorted(font_numbers):
+            ttf_path = collection_face_output(collection_path, font_number)
+            if use_cache:
+                key = get_collection_face_cache_key(collection_path, font_number)
+                if restore_from_cache(config, key, ttf_path):
+                    if verbose:
+                        logging.info(f"转换结果来自缓存: {os.path.basename(ttf_path)}")
+                    continue
+                cache_keys[font_number] = key
+            else:
+                cache_keys[font_number] = None
+        if not cache_keys:
+            continue
+        ttf_files = convert_font_collection(
+            collection_path,
+            font_numbers=sorted(cache_keys),
+            verbose=verbose,
+            use_parallel=use_parallel,
+            max_workers=max_workers,
+        )
+        for font_number, key in cache_keys.items():
+            ttf_path = collection_face_output(collection_path, font_number)
+            if key and ttf_path in ttf_files:
+                store_in_cache(config, key, ttf_path)
+
+
 def update_mapping_otf_to_ttf(
     mapping, temp_dir, verbose=True, config=None, msyh_mapping=None, segoe_mapping=None
 ):
     """
     更新映射表中的OTF文件为TTF文件。
+    源字体也可以是字体集合中的单个字体，写作 "xxx.otc#序号"，会被替换为转换得到的 TTF。
     mapping: 原始映射表
     temp_dir: 临时目录
     verbose: 是否详细输出
@@ -329,10 +690,55 @@ def update_mapping_otf_to_ttf(
     # 收集所有需要转换的OTF文件
     items = mapping if isinstance(mapping, list) else mapping.items()
     otf_set = set()
+    face_refs = {}
     for dst, src in items:
-        if src.lower().endswith(".otf"):
+        face_ref = split_face_reference(src)
+        if face_ref:
+            face_refs.setdefault(face_ref[0], set()).add(face_ref[1])
+        elif src.lower().endswith(".otf"):
             otf_set.add(os.path.join(temp_dir, src))
 
+    if face_refs:
+        try:
+            _convert_mapped_collection_faces(face_refs, temp_dir, verbose, config)
+        except Exception as e:
+            msg = f"字体集合转 TTF 失败: {e}"
+            if verbose:
+                logging.error(msg)
+            raise RuntimeError(msg)
+
+    engine = "face"
+    if config:
+        engine = get_config_value(config, "OTF_CONVERSION_ENGINE", "face")
+
+    # 先从构建缓存恢复已转换过的相同输入，只转换有变化的字体
+    cache_keys = {}
+    if otf_set and config and get_config_value(config, "ENABLE_BUILD_CACHE", False):
+        # family 方式下同组字重一起转换，整组都命中缓存才使用，否则整组重新转换以保持点兼容
+        groups = {}
+        for otf_path in sorted(otf_set):
+            if not os.path.exists(otf_path):
+                continue
+            group = get_family_key(otf_path) if engine == "family" else otf_path
+            groups.setdefault(group, []).append(otf_path)
+        for otf_paths in groups.values():
+            family_paths = otf_paths if engine == "family" else None
+            keys = {
+                otf_path: get_conversion_cache_key(otf_path, engine, family_paths)
+                for otf_path in otf_paths
+            }
+            if all(
+                restore_from_cache(config, key, os.path.splitext(otf_path)[0] + ".ttf")
+                for otf_path, key in keys.items()
+            ):
+                otf_set.difference_update(otf_paths)
+                if verbose:
+                    for otf_path in otf_paths:
+                        ttf_name = os.path.splitext(os.path.basename(otf_path))[0]
+                        logging.info(f"转换结果来自缓存: {ttf_name}.ttf")
+            else:
+                cache_keys.update(keys)
+
     # 使用批量转换函数处理所有 OTF 文件
     if otf_set:
         if verbose:
@@ -342,15 +748,25 @@ def update_mapping_otf_to_ttf(
         use_parallel = True
         max_workers = None
         enable_grouping = True
+        glyph_shard_workers = None
+        memory_budget = None
+        recycle_workers = False
         if config:
             use_parallel = get_config_value(
                 config, "ENABLE_PARALLEL_OTF_CONVERSION", True
             )
             max_workers = get_config_value(config, "MAX_PARALLEL_WORKERS", None)
             enable_grouping = get_config_value(config, "ENABLE_FONT_GROUPING", True)
+            glyph_shard_workers = get_config_value(
+                config, "OTF_GLYPH_SHARD_WORKERS", None
+            )
+            memory_budget = get_memory_budget(config)
+            recycle_workers = get_config_value(
+                config, "ENABLE_MEMORY_OPTIMIZATION", True
+            )
 
         try:
-            batch_convert_otf_to_ttf(
+            ttf_files = batch_convert_otf_to_ttf(
                 temp_dir,
                 verbose=verbose,
                 target_files=list(otf_set),
@@ -358,6 +774,10 @@ def update_mapping_otf_to_ttf(
                 max_workers=max_workers,
                 msyh_mapping=msyh_mapping if enable_grouping else None,
                 segoe_mapping=segoe_mapping if enable_grouping else None,
+                engine=engine,
+                glyph_shard_workers=glyph_shard_workers,
+                memory_budget=memory_budget,
+                recycle_workers=recycle_workers,
             )
         except Exception as e:
             msg = f"批量 OTF 转 TTF 失败: {e}"
@@ -365,9 +785,17 @@ def update_mapping_otf_to_ttf(
                 logging.error(msg)
             raise RuntimeError(msg)
 
+        for otf_path, key in cache_keys.items():
+            ttf_path = os.path.splitext(otf_path)[0] + ".ttf"
+            if ttf_path in ttf_files:
+                store_in_cache(config, key, ttf_path)
+
     new_mapping = []
     for dst, src in items:
-        if src.lower().endswith(".otf"):
+        face_ref = split_face_reference(src)
+        if face_ref:
+            new_mapping.append((dst, collection_face_output(*face_ref)))
+        elif src.lower().endswith(".otf"):
             ttf_src = os.path.splitext(src)[0] + ".ttf"
             new_mapping.append((dst, ttf_src))
         else:
@@ -377,24 +805,27 @@ def update_mapping_otf_to_ttf(
 
 def process_custom_font_packages(config):
     """
-    处理自定义字体包中的OTF转TTF逻辑
+    处理自定义字体包中的OTF转TTF逻辑。
+    微软雅黑与 Segoe UI 映射中的 OTF 合并为一批转换，共用同一个进程池。
     """
     temp_dir = config.get("TEMP_DIR", "./temp")
-    if "msyh_mapping" in config:
-        config["msyh_mapping"] = update_mapping_otf_to_ttf(
-            config["msyh_mapping"],
-            temp_dir,
-            verbose=True,
-            config=config,
-            msyh_mapping=config.get("msyh_mapping"),
-            segoe_mapping=config.get("segoe_mapping"),
-        )
-    if "segoe_mapping" in config:
-        config["segoe_mapping"] = update_mapping_otf_to_ttf(
-            config["segoe_mapping"],
-            temp_dir,
-            verbose=True,
-            config=config,
-            msyh_mapping=config.get("msyh_mapping"),
-            segoe_mapping=config.get("segoe_mapping"),
-        )
+    names = [name for name in ("msyh_mapping", "segoe_mapping") if config.get(name)]
+    if not names:
+        return
+    mappings = [
+        list(config[name] if isinstance(config[name], list) else config[name].items())
+        for name in names
+    ]
+    new_mapping = update_mapping_otf_to_ttf(
+        [item for mapping in mappings for item in mapping],
+        temp_dir,
+        verbose=True,
+        config=config,
+        msyh_mapping=config.get("msyh_mapping"),
+        segoe_mapping=config.get("segoe_mapping"),
+    )
+    # 按原顺序把转换后的映射拆回各自的映射表
+    offset = 0
+    for name, mapping in zip(names, mappings):
+        config[name] = new_mapping[offset : offset + len(mapping)]
+        offset += len(mapping)
@@ -0,0 +1,30 @@
+"""
+并行处理模块
+提供按提交顺序返回结果的进程池执行工具
+"""
+
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+
+from .profiling import profile_call
+
+
+def run_in_order(worker, task_args, use_parallel=True, max_workers=None):
+    """
+    依次产出 worker(*args) 的结果，顺序与 task_args 一致。
+    use_parallel 为 True 且任务多于一个时使用进程池，worker 必须是模块级函数。
+    max_workers: 最大工作进程数，为 None 时使用 CPU 核心数
+    """
+    task_args = list(task_args)
+    if not use_parallel or len(task_args) <= 1:
+        for args in task_args:
+            yield worker(*args)
+        return
+
+    if max_workers is None:
+        max_workers = mp.cpu_count()
+    max_workers = max(1, min(max_workers, len(task_args)))
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(profile_call, worker, *args) for args in task_args]
+        for future in futures:
+            yield future.result()
@@ -0,0 +1,199 @@
+"""
+性能分析模块
+按配置或环境变量对选定阶段启用 cProfile，进程池中的子进程同样会被分析，
+每个阶段、每个子进程各输出一个 .pstats 文件，并汇总出最耗时的函数
+"""
+
+import cProfile
+import glob
+import io
+import logging
+import os
+import pstats
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+
+from .config import get_config_value
+
+# 环境变量：要分析的阶段（逗号分隔，all 表示全部），优先于配置文件
+PROFILE_ENV = "ZHFR_PROFILE"
+# 以下两个环境变量由主进程设置，子进程据此判断是否需要分析
+PROFILE_DIR_ENV = "ZHFR_PROFILE_DIR"
+PROFILE_STAGE_ENV = "ZHFR_PROFILE_STAGE"
+
+# 汇总中列出的函数个数
+SUMMARY_TOP_N = 30
+
+_selected_stages = set()
+_profile_dir = None
+_local = threading.local()
+
+
+def configure_profiling(config):
+    """
+    读取 PROFILE_STAGES 配置（或 ZHFR_PROFILE 环境变量），决定要分析的阶段。
+    分析结果先写入系统临时目录下的独立目录（不在 TEMP_DIR 中，清理 temp 时不会被删除），
+    流程结束后由 collect_profiles 移到结果目录。
+    返回要分析的阶段集合。
+    """
+    global _selected_stages, _profile_dir
+    stages = os.environ.get(PROFILE_ENV)
+    if stages is not None:
+        stages = [stage.strip() for stage in stages.split(",")]
+    else:
+        stages = get_config_value(config, "PROFILE_STAGES", []) or []
+        if isinstance(stages, str):
+            stages = [stages]
+    _selected_stages = {stage for stage in stages if stage}
+    if _profile_dir is not None:
+        shutil.rmtree(_profile_dir, ignore_errors=True)
+    if _selected_stages:
+        _profile_dir = tempfile.mkdtemp(prefix="zhfr-profile-")
+        logging.info(f"性能分析已启用，分析阶段: {', '.join(sorted(_selected_stages))}")
+    else:
+        _profile_dir = None
+    return _selected_stages
+
+
+def _profiling_in_this_thread():
+    """
+    当前线程是否已有阶段在分析。fork 出的子进程会继承父进程主线程的 threading.local，
+    因此同时比较进程号。
+    """
+    active = getattr(_local, "active", None)
+    return bool(active) and active[1] == os.getpid()
+
+
+def _should_profile(stage):
+    if not _selected_stages or _profile_dir is None:
+        return False
+    return "all" in _selected_stages or stage in _selected_stages
+
+
+@contextmanager
+def stage_profiler(stage):
+    """
+    在选定阶段内启用 cProfile，并让此期间创建的进程池子进程也进行分析。
+    同一线程中已有阶段在分析时（嵌套阶段）不再重复启用。
+    """
+    if not _should_profile(stage) or _profiling_in_this_thread():
+        yield
+        return
+
+    profiler = cProfile.Profile()
+    saved_env = {
+        key: os.environ.get(key) for key in (PROFILE_DIR_ENV, PROFILE_STAGE_ENV)
+    }
+    os.environ[PROFILE_DIR_ENV] = _profile_dir
+    os.environ[PROFILE_STAGE_ENV] = stage
+    _local.active = (stage, os.getpid())
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        _local.active = None
+        for key, value in saved_env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        try:
+            # 分析目录被意外删除时重新创建，分析失败不应影响构建结果
+            os.makedirs(_profile_dir, exist_ok=True)
+            profiler.dump_stats(os.path.join(_profile_dir, f"{stage}.pstats"))
+            summarize_stage(stage)
+        except OSError as e:
+            logging.warning(f"保存 {stage} 阶段的性能分析结果失败: {e}")
+
+
+def profile_call(func, *args):
+    """
+    在进程池/线程池中运行 func(*args)。所在阶段启用了分析时，用该进程（线程）
+    自己的 cProfile 累计分析并写入 <阶段>.worker-<pid>.pstats；否则直接调用。
+    提交任务时用 executor.submit(profile_call, worker, *args) 代替 submit(worker, *args)。
+    """
+    profile_dir = os.environ.get(PROFILE_DIR_ENV)
+    stage = os.environ.get(PROFILE_STAGE_ENV)
+    if not profile_dir or not stage or _profiling_in_this_thread():
+        return func(*args)
+
+    profiler, owner = getattr(_local, "task_profiler", (None, None))
+    if profiler is None or owner != os.getpid():
+        profiler = cProfile.Profile()
+        _local.task_profiler = (profiler, os.getpid())
+    try:
+        profiler.enable()
+    except ValueError:
+        # Python 3.12 起同一进程只能有一个分析器，主进程已在分析时线程池任务不再单独分析
+        return func(*args)
+    try:
+        return func(*args)
+    finally:
+        profiler.disable()
+        worker = f"{os.getpid()}"
+        if threading.current_thread() is not threading.main_thread():
+            worker += f"-{threading.get_ident()}"
+        # 每个任务结束后覆盖写入，子进程被回收时也不会丢失数据
+        try:
+            os.makedirs(profile_dir, exist_ok=True)
+            profiler.dump_stats(
+                os.path.join(profile_dir, f"{stage}.worker-{worker}.pstats")
+            )
+        except OSError as e:
+            logging.warning(f"保存子进程性能分析结果失败: {e}")
+
+
+def summarize_stage(stage, top_n=SUMMARY_TOP_N):
+    """
+    合并某阶段主进程与全部子进程的 .pstats，按函数自身耗时排序，
+    写出 <阶段>.summary.txt 并在日志中列出前几项。
+    """
+    files = sorted(glob.glob(os.path.join(_profile_dir, f"{stage}.worker-*.pstats")))
+    main_file = os.path.join(_profile_dir, f"{stage}.pstats")
+    if os.path.exists(main_file):
+        files.insert(0, main_file)
+    if not files:
+        return None
+
+    stream = io.StringIO()
+    stats = pstats.Stats(*files, stream=stream)
+    stream.write(
+        f"阶段: {stage}，合并 {len(files)} 个分析文件"
+        f"（子进程 {len(files) - (1 if os.path.exists(main_file) else 0)} 个）\n"
+    )
+    stats.sort_stats(pstats.SortKey.TIME).print_stats(top_n)
+    summary_path = os.path.join(_profile_dir, f"{stage}.summary.txt")
+    with open(summary_path, "w", encoding="utf-8") as f:
+        f.write(stream.getvalue())
+
+    top = stats.get_stats_profile().func_profiles
+    hottest = sorted(top.items(), key=lambda item: item[1].tottime, reverse=True)[:5]
+    logging.info(f"[性能分析] {stage} 最耗时的函数:")
+    for name, profile in hottest:
+        location = f"{os.path.basename(profile.file_name)}:{profile.line_number}"
+        logging.info(f"  {profile.tottime:8.3f} 秒  {name} ({location})")
+    return summary_path
+
+
+def collect_profiles(result_dir):
+    """将本次运行的分析结果移动到 result_dir/profile 下并删除临时的分析目录，返回目标目录"""
+    global _profile_dir
+    if _profile_dir is None:
+        return None
+    profile_dir, _profile_dir = _profile_dir, None
+    try:
+        names = os.listdir(profile_dir)
+    except OSError:
+        return None
+    target = None
+    if names:
+        target = os.path.join(result_dir, "profile")
+        os.makedirs(target, exist_ok=True)
+        for name in names:
+            shutil.move(os.path.join(profile_dir, name), os.path.join(target, name))
+        logging.info(f"性能分析结果已保存到: {target}")
+    shutil.rmtree(profile_dir, ignore_errors=True)
+    return target
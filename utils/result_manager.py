@@ -4,7 +4,11 @@
 """
 
 import datetime
+import logging
 import os
+import shutil
+
+from .file_ops import publish_file, safe_copy
 
 
 def get_new_result_dir(config):
@@ -27,6 +31,35 @@ def get_new_result_dir(config):
     return full
 
 
+# 结果目录创建前就失败时，耗时统计与性能分析结果写到 RESULT_DIR 下的这个目录
+# （不以 ver 开头，不会被当作版本目录），每次失败时覆盖
+FAILED_RUN_DIRNAME = "last_failed_run"
+
+
+def get_failed_run_dir(config):
+    """清空并返回保存失败运行报告的目录"""
+    full = os.path.join(config.get("RESULT_DIR", "./result"), FAILED_RUN_DIRNAME)
+    shutil.rmtree(full, ignore_errors=True)
+    os.makedirs(full, exist_ok=True)
+    return full
+
+
+def publish_result(config, src, dst):
+    """
+    把 temp 目录中生成的文件发布到结果目录。
+    启用 ENABLE_LINK_PUBLISH 时优先使用硬链接或 reflink，不复制数据；
+    启用 CLEAN_TEMP_ON_SUCCESS 时 temp 中的文件随后会被删除，也允许直接移动。
+    """
+    if not config.get("ENABLE_LINK_PUBLISH", True):
+        safe_copy(src, dst)
+        return "copy"
+    method = publish_file(
+        src, dst, allow_move=config.get("CLEAN_TEMP_ON_SUCCESS", False)
+    )
+    logging.debug(f"发布结果文件 ({method}): {os.path.basename(dst)}")
+    return method
+
+
 def write_version_report(config, now_format, full):
     """生成版本报告"""
     report_lines = []
@@ -0,0 +1,180 @@
+"""
+结果存储模块
+把各版本结果目录中的文件按 SHA-256 存入 RESULT_DIR 下的内容寻址存储，版本目录中只保留硬链接，
+内容相同的输出只占用一份空间；每个版本写出 manifest.json，并提供只保留最近 N 个版本的清理功能
+（命令行: python clean_results.py --keep 5）
+"""
+
+import datetime
+import json
+import logging
+import os
+import re
+import shutil
+
+from .config import get_config_value
+from .digest import file_sha256
+from .file_ops import ensure_dir_exists
+
+# 内容寻址存储目录，位于 RESULT_DIR 下（不以 ver 开头，不会被当作版本目录）
+OBJECTS_DIRNAME = ".objects"
+MANIFEST_FILENAME = "manifest.json"
+
+# 版本目录名，如 ver03-202501011200
+VERSION_DIR_PATTERN = re.compile(r"^ver(\d+)-")
+
+
+def get_store_dir(config):
+    """获取内容寻址存储目录"""
+    result_dir = get_config_value(config, "RESULT_DIR", "./result")
+    return os.path.join(result_dir, OBJECTS_DIRNAME)
+
+
+def _object_path(store_dir, digest):
+    return os.path.join(store_dir, digest[:2], digest)
+
+
+def list_version_dirs(config):
+    """按版本号从旧到新列出 RESULT_DIR 下的版本目录（完整路径）"""
+    result_dir = get_config_value(config, "RESULT_DIR", "./result")
+    if not os.path.isdir(result_dir):
+        return []
+    versions = []
+    for entry in os.scandir(result_dir):
+        match = VERSION_DIR_PATTERN.match(entry.name)
+        if match and entry.is_dir(follow_symlinks=False):
+            versions.append((int(match.group(1)), entry.name, entry.path))
+    return [path for _, _, path in sorted(versions)]
+
+
+def load_manifest(version_dir):
+    """读取版本目录的 manifest.json，不存在或损坏时返回 None"""
+    try:
+        with open(os.path.join(version_dir, MANIFEST_FILENAME), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _previous_manifest(config, result_dir):
+    """返回 result_dir 之前最近一个带 manifest 的版本目录及其 manifest"""
+    current = os.path.abspath(result_dir)
+    previous = None, None
+    for version_dir in list_version_dirs(config):
+        if os.path.abspath(version_dir) == current:
+            break
+        manifest = load_manifest(version_dir)
+        if manifest:
+            previous = version_dir, manifest
+    return previous
+
+
+def store_result_files(config, result_dir):
+    """
+    把 result_dir 中的文件存入内容寻址存储，并写出 manifest.json。
+    存储中已有相同内容时，result_dir 中的文件替换为指向已有对象的硬链接；
+    文件系统不支持硬链接时保留原文件，只记录摘要。
+    注意：各版本共享同一份数据，请勿直接修改结果目录中的文件。
+    返回 manifest。
+    """
+    store_dir = get_store_dir(config)
+    files = {}
+    reused_count = 0
+    saved_bytes = 0
+    for entry in sorted(os.scandir(result_dir), key=lambda e: e.name):
+        if not entry.is_file(follow_symlinks=False) or entry.name == MANIFEST_FILENAME:
+            continue
+        size = entry.stat().st_size
+        digest = file_sha256(entry.path, use_cache=False)
+        files[entry.name] = {"sha256": digest, "size": size}
+
+        obj = _object_path(store_dir, digest)
+        if os.path.exists(obj):
+            if not os.path.samefile(obj, entry.path):
+                # 先链接到临时文件再替换，中途失败时原文件保持不变
+                tmp_path = entry.path + ".tmp"
+                try:
+                    os.link(obj, tmp_path)
+                    os.replace(tmp_path, entry.path)
+                except OSError as e:
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+                    logging.debug(f"无法链接到已有结果: {entry.name}，原因: {e}")
+                    continue
+            reused_count += 1
+            saved_bytes += size
+        else:
+            ensure_dir_exists(os.path.dirname(obj))
+            try:
+                os.link(entry.path, obj)
+            except OSError as e:
+                logging.debug(f"无法存入结果存储: {entry.name}，原因: {e}")
+
+    previous_dir, previous = _previous_manifest(config, result_dir)
+    unchanged = []
+    if previous:
+        previous_files = previous.get("files", {})
+        unchanged = sorted(
+            name
+            for name, record in files.items()
+            if previous_files.get(name, {}).get("sha256") == record["sha256"]
+        )
+    manifest = {
+        "version": os.path.basename(os.path.normpath(result_dir)),
+        "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "previous": os.path.basename(previous_dir) if previous_dir else None,
+        "unchanged": unchanged,
+        "files": files,
+    }
+    with open(os.path.join(result_dir, MANIFEST_FILENAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+
+    logging.info(
+        f"结果已存入去重存储: {len(files)} 个文件，其中 {reused_count} 个复用已有内容"
+        f"（节省 {saved_bytes / 1024 / 1024:.1f} MB）"
+    )
+    if previous_dir:
+        logging.info(
+            f"与 {os.path.basename(previous_dir)} 相比未变化: "
+            f"{len(unchanged)}/{len(files)} 个文件"
+        )
+    return manifest
+
+
+def gc_results(config, keep):
+    """
+    只保留最近 keep 个版本目录，删除更早的版本，
+    再删除存储中不再被任何保留版本的 manifest 引用的对象。
+    返回 (删除的版本目录名列表, 删除的对象数)。
+    """
+    if keep is None or keep < 1:
+        raise ValueError("至少需要保留 1 个版本")
+    versions = list_version_dirs(config)
+    removed = versions[:-keep]
+    for version_dir in removed:
+        shutil.rmtree(version_dir)
+        logging.info(f"已删除旧版本: {os.path.basename(version_dir)}")
+
+    referenced = set()
+    for version_dir in versions[-keep:]:
+        manifest = load_manifest(version_dir) or {}
+        referenced.update(
+            record["sha256"] for record in manifest.get("files", {}).values()
+        )
+
+    removed_objects = 0
+    store_dir = get_store_dir(config)
+    if os.path.isdir(store_dir):
+        for fanout in os.scandir(store_dir):
+            if not fanout.is_dir(follow_symlinks=False):
+                continue
+            for obj in os.scandir(fanout.path):
+                if obj.name not in referenced:
+                    os.remove(obj.path)
+                    removed_objects += 1
+            if not os.listdir(fanout.path):
+                os.rmdir(fanout.path)
+    logging.info(
+        f"结果清理完成 - 删除版本: {len(removed)}，删除存储对象: {removed_objects}"
+    )
+    return [os.path.basename(path) for path in removed], removed_objects
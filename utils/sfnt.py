@@ -0,0 +1,309 @@
+"""
+SFNT 底层读写模块
+直接操作 TTF 的表目录与原始表数据，不经过 fontTools 的解析与编译
+"""
+
+import hashlib
+import io
+import os
+import struct
+import sys
+from contextlib import nullcontext
+
+SFNT_HEADER_FORMAT = ">4sHHHH"
+SFNT_HEADER_SIZE = struct.calcsize(SFNT_HEADER_FORMAT)
+TABLE_RECORD_FORMAT = ">4sLLL"
+TABLE_RECORD_SIZE = struct.calcsize(TABLE_RECORD_FORMAT)
+
+TTC_TAG = b"ttcf"
+TTC_VERSION_1 = 0x00010000
+TTC_HEADER_FORMAT = ">4sLL"
+TTC_HEADER_SIZE = struct.calcsize(TTC_HEADER_FORMAT)
+
+# 可以直接复制表数据的 sfnt 版本（TrueType / OpenType CFF）
+SUPPORTED_SFNT_VERSIONS = (b"\x00\x01\x00\x00", b"true", b"OTTO")
+
+# head 表中 checkSumAdjustment 字段的位置与目标校验和
+HEAD_CHECKSUM_ADJUSTMENT_OFFSET = 8
+CHECKSUM_MAGIC = 0xB1B0AFBA
+
+# 非 sendfile 复制时的缓冲区大小
+COPY_BUFFER_SIZE = 1024 * 1024
+
+
+def _pad4(length):
+    """返回补齐到 4 字节边界后的长度"""
+    return (length + 3) & ~3
+
+
+def _search_params(num_tables):
+    """计算表目录头中的 searchRange / entrySelector / rangeShift"""
+    entry_selector = 0
+    while (1 << (entry_selector + 1)) <= num_tables:
+        entry_selector += 1
+    search_range = (1 << entry_selector) * 16
+    range_shift = num_tables * 16 - search_range
+    return search_range, entry_selector, range_shift
+
+
+def calc_checksum(data):
+    """计算 sfnt 表校验和（按大端 uint32 求和，不足 4 字节补零）"""
+    remainder = len(data) % 4
+    if remainder:
+        data += b"\0" * (4 - remainder)
+    values = struct.unpack(f">{len(data) // 4}L", data)
+    return sum(values) & 0xFFFFFFFF
+
+
+def _open_font(source):
+    """
+    以二进制只读方式打开字体。source 可以是路径，也可以是已打开的二进制文件对象
+    （如从压缩包读出的 BytesIO），后者不会被关闭。
+    """
+    if hasattr(source, "read"):
+        return nullcontext(source)
+    return open(source, "rb")
+
+
+def _describe(source):
+    """用于错误信息的字体名称"""
+    if hasattr(source, "read"):
+        return getattr(source, "name", "<内存中的字体>")
+    return source
+
+
+def _is_os_file(f):
+    """f 是否对应真实的文件描述符（可用于 sendfile）"""
+    try:
+        f.fileno()
+    except (AttributeError, OSError):
+        return False
+    return True
+
+
+def read_table_directory(f, offset=0):
+    """
+    读取 offset 处的 sfnt 表目录。
+    返回 (sfnt_version, records)，records 为 [(tag, checksum, offset, length)]。
+    """
+    f.seek(offset)
+    header = f.read(SFNT_HEADER_SIZE)
+    if len(header) < SFNT_HEADER_SIZE:
+        raise ValueError("文件过短，不是有效的 sfnt 字体")
+    sfnt_version, num_tables, _, _, _ = struct.unpack(SFNT_HEADER_FORMAT, header)
+    if sfnt_version not in SUPPORTED_SFNT_VERSIONS:
+        raise ValueError(f"不支持的 sfnt 版本: {sfnt_version!r}")
+    data = f.read(TABLE_RECORD_SIZE * num_tables)
+    if len(data) < TABLE_RECORD_SIZE * num_tables:
+        raise ValueError("表目录不完整")
+    records = [
+        struct.unpack_from(TABLE_RECORD_FORMAT, data, i * TABLE_RECORD_SIZE)
+        for i in range(num_tables)
+    ]
+    return sfnt_version, records
+
+
+def read_tables(path):
+    """
+    读取单个 TTF/OTF 的全部原始表数据，path 也可以是二进制文件对象。
+    返回 (sfnt_version, [(tag, checksum, data)])，按表目录顺序排列。
+    """
+    with _open_font(path) as f:
+        sfnt_version, records = read_table_directory(f)
+        tables = []
+        for tag, checksum, offset, length in records:
+            f.seek(offset)
+            data = f.read(length)
+            if len(data) != length:
+                raise ValueError(
+                    f"表 {tag.decode('latin-1')} 数据不完整: {_describe(path)}"
+                )
+            tables.append((tag, checksum, data))
+    return sfnt_version, tables
+
+
+def build_collection(font_paths, output_path):
+    """
+    将多个 TTF（路径或二进制文件对象）合并为 TTC，相同的表（按 tag + SHA-256 判断）
+    只写入一次，各字体的表目录指向同一偏移。表数据按原样复制，不做解析与重新编译。
+    返回 (写入的表数据字节数, 因共享而省下的字节数)。
+    """
+    faces = [read_tables(path) for path in font_paths]
+    num_fonts = len(faces)
+    if num_fonts == 0:
+        raise ValueError("TTC 至少需要包含一个字体")
+
+    # 计算头部与所有表目录占用的空间，表数据紧随其后
+    header_size = TTC_HEADER_SIZE + 4 * num_fonts
+    dir_offsets = []
+    pos = header_size
+    for _, tables in faces:
+        dir_offsets.append(pos)
+        pos += _pad4(SFNT_HEADER_SIZE + TABLE_RECORD_SIZE * len(tables))
+
+    # 按首次出现顺序为每个不同的表分配偏移
+    blob_offsets = {}
+    blobs = []
+    face_entries = []
+    shared_bytes = 0
+    for _, tables in faces:
+        entries = []
+        for tag, checksum, data in tables:
+            key = (tag, hashlib.sha256(data).digest())
+            offset = blob_offsets.get(key)
+            if offset is None:
+                offset = pos
+                blob_offsets[key] = offset
+                blobs.append(data)
+                pos += _pad4(len(data))
+            else:
+                shared_bytes += len(data)
+            entries.append((tag, checksum, offset, len(data)))
+        # 表目录要求按 tag 升序排列
+        entries.sort(key=lambda entry: entry[0])
+        face_entries.append(entries)
+
+    # 先写临时文件再替换：output_path 若与已发布的结果文件是硬链接，不会被原地改写
+    tmp_path = output_path + ".tmp"
+    try:
+        with open(tmp_path, "wb") as out:
+            out.write(struct.pack(TTC_HEADER_FORMAT, TTC_TAG, TTC_VERSION_1, num_fonts))
+            out.write(struct.pack(f">{num_fonts}L", *dir_offsets))
+            for (sfnt_version, _), entries in zip(faces, face_entries):
+                num_tables = len(entries)
+                out.write(
+                    struct.pack(
+                        SFNT_HEADER_FORMAT,
+                        sfnt_version,
+                        num_tables,
+                        *_search_params(num_tables),
+                    )
+                )
+                for entry in entries:
+                    out.write(struct.pack(TABLE_RECORD_FORMAT, *entry))
+                dir_size = SFNT_HEADER_SIZE + TABLE_RECORD_SIZE * num_tables
+                out.write(b"\0" * (_pad4(dir_size) - dir_size))
+            written_bytes = 0
+            for data in blobs:
+                out.write(data)
+                out.write(b"\0" * (_pad4(len(data)) - len(data)))
+                written_bytes += len(data)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, output_path)
+    return written_bytes, shared_bytes
+
+
+def read_table(path, tag):
+    """
+    只读取单个表的原始数据，字体其余部分不会被读入。path 也可以是二进制文件对象。
+    """
+    tag = tag.encode("latin-1") if isinstance(tag, str) else tag
+    with _open_font(path) as f:
+        _, records = read_table_directory(f)
+        for record_tag, _, offset, length in records:
+            if record_tag == tag:
+                f.seek(offset)
+                return f.read(length)
+    raise KeyError(f"字体中没有 {tag.decode('latin-1')} 表: {_describe(path)}")
+
+
+def _copy_range(src, dst, offset, length):
+    """把 src 中 [offset, offset + length) 的数据写入 dst 当前位置"""
+    if sys.platform.startswith("linux") and _is_os_file(src) and _is_os_file(dst):
+        # Linux 下文件间的 sendfile 在内核中完成，数据不经过用户态；
+        # sendfile 直接写文件描述符，需先把 dst 缓冲区中的数据写出，保证先后顺序
+        dst.flush()
+        while length > 0:
+            sent = os.sendfile(dst.fileno(), src.fileno(), offset, length)
+            if sent == 0:
+                raise ValueError("源文件在复制过程中被截断")
+            offset += sent
+            length -= sent
+        return
+    src.seek(offset)
+    while length > 0:
+        chunk = src.read(min(COPY_BUFFER_SIZE, length))
+        if not chunk:
+            raise ValueError("源文件在复制过程中被截断")
+        dst.write(chunk)
+        length -= len(chunk)
+
+
+def replace_table(src_path, dst_path, tag, data):
+    """
+    将 src_path 中的 tag 表替换为 data 并写入 dst_path（可与 src_path 相同）。
+    重新计算表目录中的偏移、长度、校验和以及 head.checkSumAdjustment，
+    其余表按原始字节直接复制，不做任何解析。
+    src_path 也可以是二进制文件对象；dst_path 为 None 时不写文件，返回新字体的字节数据。
+    """
+    tag = tag.encode("latin-1") if isinstance(tag, str) else tag
+    with _open_font(src_path) as src:
+        sfnt_version, records = read_table_directory(src)
+        if tag not in {record[0] for record in records}:
+            raise KeyError(
+                f"字体中没有 {tag.decode('latin-1')} 表: {_describe(src_path)}"
+            )
+
+        # 沿用原文件中表数据的物理顺序，只重新计算偏移
+        num_tables = len(records)
+        pos = _pad4(SFNT_HEADER_SIZE + TABLE_RECORD_SIZE * num_tables)
+        layout = []
+        entries = []
+        head_data = None
+        for record_tag, checksum, offset, length in sorted(records, key=lambda r: r[2]):
+            if record_tag == tag:
+                checksum, length = calc_checksum(data), len(data)
+            elif record_tag == b"head":
+                src.seek(offset)
+                head_data = bytearray(src.read(length))
+                head_data[
+                    HEAD_CHECKSUM_ADJUSTMENT_OFFSET : HEAD_CHECKSUM_ADJUSTMENT_OFFSET
+                    + 4
+                ] = b"\0\0\0\0"
+                checksum = calc_checksum(bytes(head_data))
+            layout.append((record_tag, offset, length))
+            entries.append((record_tag, checksum, pos, length))
+            pos += _pad4(length)
+        entries.sort(key=lambda entry: entry[0])
+
+        directory = struct.pack(
+            SFNT_HEADER_FORMAT, sfnt_version, num_tables, *_search_params(num_tables)
+        ) + b"".join(struct.pack(TABLE_RECORD_FORMAT, *entry) for entry in entries)
+        directory += b"\0" * (_pad4(len(directory)) - len(directory))
+
+        if head_data is not None:
+            total = calc_checksum(directory) + sum(entry[1] for entry in entries)
+            adjustment = (CHECKSUM_MAGIC - total) & 0xFFFFFFFF
+            struct.pack_into(
+                ">L", head_data, HEAD_CHECKSUM_ADJUSTMENT_OFFSET, adjustment
+            )
+
+        def write_font(out):
+            out.write(directory)
+            for record_tag, offset, length in layout:
+                if record_tag == tag:
+                    out.write(data)
+                elif record_tag == b"head":
+                    out.write(head_data)
+                else:
+                    _copy_range(src, out, offset, length)
+                out.write(b"\0" * (_pad4(length) - length))
+
+        if dst_path is None:
+            out = io.BytesIO()
+            write_font(out)
+            return out.getvalue()
+
+        tmp_path = dst_path + ".tmp"
+        try:
+            # 使用带缓冲的文件对象：其 write() 总会写完全部数据，不会出现部分写入
+            with open(tmp_path, "wb") as out:
+                write_font(out)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+    os.replace(tmp_path, dst_path)
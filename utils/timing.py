@@ -0,0 +1,253 @@
+"""
+耗时统计模块
+以阶段（span）为单位记录流水线各步骤的耗时与内存峰值，并写出 timings.json
+"""
+
+import datetime
+import json
+import logging
+import multiprocessing as mp
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from .profiling import stage_profiler
+
+# 内存采样间隔（秒）
+SAMPLE_INTERVAL = 0.05
+
+TIMINGS_FILENAME = "timings.json"
+
+_lock = threading.Lock()
+_spans = []  # 已结束的阶段
+_open_spans = []  # 正在进行的阶段（按开始顺序）
+_local = threading.local()  # 每个线程当前所在的阶段栈
+_origin = {"time": time.perf_counter(), "wall": datetime.datetime.now()}
+_sampler = None
+# Windows 下延迟初始化的 (结构体类型, GetCurrentProcess, GetProcessMemoryInfo)
+_win_memory_info = None
+
+
+def _get_windows_memory_counters():
+    """Windows 下用 GetProcessMemoryInfo 读取当前进程的内存计数，失败时返回 None"""
+    global _win_memory_info
+    import ctypes
+    from ctypes import wintypes
+
+    if _win_memory_info is None:
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [
+                ("cb", wintypes.DWORD),
+                ("PageFaultCount", wintypes.DWORD),
+                ("PeakWorkingSetSize", ctypes.c_size_t),
+                ("WorkingSetSize", ctypes.c_size_t),
+                ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                ("PagefileUsage", ctypes.c_size_t),
+                ("PeakPagefileUsage", ctypes.c_size_t),
+            ]
+
+        kernel32 = ctypes.WinDLL("kernel32")
+        kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+        psapi = ctypes.WinDLL("psapi")
+        psapi.GetProcessMemoryInfo.argtypes = [
+            wintypes.HANDLE,
+            ctypes.POINTER(PROCESS_MEMORY_COUNTERS),
+            wintypes.DWORD,
+        ]
+        psapi.GetProcessMemoryInfo.restype = wintypes.BOOL
+        _win_memory_info = (
+            PROCESS_MEMORY_COUNTERS,
+            kernel32.GetCurrentProcess,
+            psapi.GetProcessMemoryInfo,
+        )
+
+    counters_class, get_current_process, get_process_memory_info = _win_memory_info
+    counters = counters_class()
+    counters.cb = ctypes.sizeof(counters)
+    if not get_process_memory_info(
+        get_current_process(), ctypes.byref(counters), counters.cb
+    ):
+        return None
+    return counters
+
+
+def get_rss():
+    """当前进程的常驻内存（字节），Windows 下为工作集大小，无法获取时返回 None"""
+    if sys.platform.startswith("linux"):
+        try:
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError, IndexError):
+            return None
+    if sys.platform == "win32":
+        try:
+            counters = _get_windows_memory_counters()
+        except (OSError, AttributeError):
+            return None
+        return counters.WorkingSetSize if counters else None
+    return None
+
+
+def get_peak_rss(children=False):
+    """
+    进程生命周期内的常驻内存峰值（字节），Windows 下为工作集峰值。
+    children 为 True 时返回进程启动以来所有已结束子进程（如进程池 worker）中的最大峰值，
+    Windows 下无法获取，返回 None。
+    """
+    if sys.platform == "win32":
+        if children:
+            return None
+        try:
+            counters = _get_windows_memory_counters()
+        except (OSError, AttributeError):
+            return None
+        return counters.PeakWorkingSetSize if counters else None
+    try:
+        import resource
+    except ImportError:
+        return None
+    who = resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+    peak = resource.getrusage(who).ru_maxrss
+    # macOS 以字节为单位，Linux 以 KB 为单位
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def get_worker_peak_rss():
+    """
+    在进程池子进程中调用时返回该子进程生命周期内的常驻内存峰值（字节），
+    由 worker 随结果返回，主进程再通过 record_task(..., peak_rss_bytes=...) 记到所在阶段；
+    在主进程中（串行执行或线程池）调用时返回 None。
+    """
+    if mp.parent_process() is None:
+        return None
+    return get_peak_rss()
+
+
+def _sample_loop():
+    while True:
+        time.sleep(SAMPLE_INTERVAL)
+        rss = get_rss()
+        if rss is None:
+            return
+        with _lock:
+            for record in _open_spans:
+                if rss > record["peak_rss_bytes"]:
+                    record["peak_rss_bytes"] = rss
+
+
+def _ensure_sampler():
+    global _sampler
+    if _sampler is None and get_rss() is not None:
+        _sampler = threading.Thread(target=_sample_loop, daemon=True)
+        _sampler.start()
+
+
+def _stack():
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+
+@contextmanager
+def span(name, **attrs):
+    """
+    记录一个阶段的耗时与内存峰值，可嵌套使用。
+    peak_rss_bytes 为主进程的峰值；阶段内的任务在进程池中运行时，
+    workers_peak_rss_bytes 为各任务所报告子进程峰值中的最大值。
+    attrs 为附加信息（如文件数），会原样写入 timings.json。
+    该阶段被选中进行性能分析时同时启用 cProfile（见 utils.profiling）。
+    """
+    _ensure_sampler()
+    stack = _stack()
+    rss = get_rss()
+    record = {
+        "name": name,
+        "parent": stack[-1]["name"] if stack else None,
+        "start": time.perf_counter() - _origin["time"],
+        "seconds": None,
+        "status": "ok",
+        "peak_rss_bytes": rss or 0,
+        "workers_peak_rss_bytes": None,
+        "attrs": attrs,
+        "tasks": [],
+    }
+    with _lock:
+        _open_spans.append(record)
+    stack.append(record)
+    start = time.perf_counter()
+    try:
+        with stage_profiler(name):
+            yield record
+    except BaseException:
+        record["status"] = "failed"
+        raise
+    finally:
+        record["seconds"] = time.perf_counter() - start
+        rss = get_rss()
+        if rss and rss > record["peak_rss_bytes"]:
+            record["peak_rss_bytes"] = rss
+        if not record["peak_rss_bytes"]:
+            record["peak_rss_bytes"] = None
+        worker_peaks = [
+            task["peak_rss_bytes"]
+            for task in record["tasks"]
+            if task.get("peak_rss_bytes")
+        ]
+        record["workers_peak_rss_bytes"] = max(worker_peaks, default=None)
+        stack.pop()
+        with _lock:
+            _open_spans.remove(record)
+            _spans.append(record)
+
+
+def record_task(name, seconds, **attrs):
+    """
+    把在子进程/线程中测得的单个任务耗时记到当前阶段下，
+    如 worker 返回的 (文件名, 用时)。不在任何阶段内时忽略。
+    子进程的内存峰值以 peak_rss_bytes 传入（见 get_worker_peak_rss）。
+    """
+    stack = _stack()
+    if stack:
+        stack[-1]["tasks"].append({"name": name, "seconds": seconds, **attrs})
+
+
+def get_spans():
+    """返回已结束阶段的记录（按结束顺序）"""
+    with _lock:
+        return list(_spans)
+
+
+def reset_timings():
+    """清空已有记录，并以当前时间作为新的起点"""
+    with _lock:
+        _spans.clear()
+    _origin["time"] = time.perf_counter()
+    _origin["wall"] = datetime.datetime.now()
+
+
+def write_timings(result_dir, filename=TIMINGS_FILENAME):
+    """将耗时记录写入 result_dir/timings.json，返回文件路径"""
+    spans = sorted(get_spans(), key=lambda record: record["start"])
+    report = {
+        "started_at": _origin["wall"].isoformat(timespec="seconds"),
+        "total_seconds": time.perf_counter() - _origin["time"],
+        "peak_rss_bytes": get_peak_rss(),
+        # 整个运行期间已结束子进程中的最大峰值，无法归属到具体阶段
+        "children_peak_rss_bytes": get_peak_rss(children=True),
+        "cpu_count": os.cpu_count(),
+        "spans": spans,
+    }
+    path = os.path.join(result_dir, filename)
+    try:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    except OSError as e:
+        logging.warning(f"写入耗时统计失败: {e}")
+        return None
+    return path